@@ -0,0 +1,166 @@
+"""
+Benchmark of rendering a 10,000-recommendation /api/recommendations response.
+
+Compares Starlette's JSONResponse (standard library json) with FastJSONResponse, on plain
+dictionaries and on result items rendered from pre-serialized templates, both for serializing
+a ready payload and for building and serializing it. Run from the repository root:
+
+    python -m benchmarks.bench_json_response
+"""
+
+import argparse
+import statistics
+import timeit
+import uuid
+from typing import Any, Dict, List
+
+from fastapi.responses import JSONResponse
+
+from webapp.api.responses import FastJSONResponse
+from webapp.models.mock_objects import MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS
+from webapp.utils import serialization
+from webapp.utils.serialization import JSONSlot, JSONTemplate
+
+RECOMMENDATIONS_PER_ITEM = 10
+DISTINCT_RECOMMENDATIONS = 50
+
+
+def _recommendation(index: int) -> Dict[str, Any]:
+    rec = MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS[0]["recommendations"][
+        index % len(MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS[0]["recommendations"])
+    ]
+    return {
+        **rec,
+        "confidence": round(0.5 + (index % DISTINCT_RECOMMENDATIONS) / 100, 2),
+    }
+
+
+def build_payload(recommendations: int, request_id: str) -> List[Dict[str, Any]]:
+    """
+    Response payload with the given number of recommendations, as plain dictionaries.
+
+    :param recommendations: Total number of recommendations
+    :param request_id: The request UUID to include in each recommendation object
+    :return: Merged results of RECOMMENDATIONS_PER_ITEM recommendations each
+    """
+    return [
+        {
+            "id": f"attribute-{start}",
+            "recommendations": [
+                {**_recommendation(i), "request_id": request_id}
+                for i in range(
+                    start, min(start + RECOMMENDATIONS_PER_ITEM, recommendations)
+                )
+            ],
+        }
+        for start in range(0, recommendations, RECOMMENDATIONS_PER_ITEM)
+    ]
+
+
+def build_templates() -> List[JSONTemplate]:
+    """
+    One template per distinct result item, serialized once ahead of the requests.
+
+    :return: Templates with ``id`` and ``request_id`` slots
+    """
+    return [
+        JSONTemplate(
+            {
+                "id": JSONSlot("id"),
+                "recommendations": [
+                    {**_recommendation(i), "request_id": JSONSlot("request_id")}
+                    for i in range(start, start + RECOMMENDATIONS_PER_ITEM)
+                ],
+            }
+        )
+        for start in range(0, DISTINCT_RECOMMENDATIONS, RECOMMENDATIONS_PER_ITEM)
+    ]
+
+
+def build_templated_payload(
+    recommendations: int, request_id: str, templates: List[JSONTemplate]
+) -> List[Dict[str, Any]]:
+    """
+    The same payload with every result item rendered from a pre-serialized template.
+
+    :param recommendations: Total number of recommendations
+    :param request_id: The request UUID to include in each recommendation object
+    :param templates: Templates from build_templates
+    :return: Merged results of RECOMMENDATIONS_PER_ITEM recommendations each
+    """
+    return [
+        templates[index % len(templates)].render(
+            id=f"attribute-{start}", request_id=request_id
+        )
+        for index, start in enumerate(
+            range(0, recommendations, RECOMMENDATIONS_PER_ITEM)
+        )
+    ]
+
+
+def _time(func, repeat: int) -> float:
+    return statistics.median(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the median rendering time of each variant.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--recommendations", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    request_id = str(uuid.uuid4())
+    payload = build_payload(args.recommendations, request_id)
+    templates = build_templates()
+    templated = build_templated_payload(args.recommendations, request_id, templates)
+    size = len(FastJSONResponse(payload).body)
+
+    def build_plain():
+        return build_payload(args.recommendations, request_id)
+
+    def build_templated():
+        return build_templated_payload(args.recommendations, request_id, templates)
+
+    # Each group is compared with its first entry, the standard library baseline
+    groups = [
+        (
+            "serialize",
+            [
+                ("JSONResponse (json)", lambda: JSONResponse(payload)),
+                ("FastJSONResponse", lambda: FastJSONResponse(payload)),
+                ("FastJSONResponse, templates", lambda: FastJSONResponse(templated)),
+            ],
+        ),
+        (
+            "build + serialize",
+            [
+                ("JSONResponse (json)", lambda: JSONResponse(build_plain())),
+                ("FastJSONResponse", lambda: FastJSONResponse(build_plain())),
+                (
+                    "FastJSONResponse, templates",
+                    lambda: FastJSONResponse(build_templated()),
+                ),
+            ],
+        ),
+    ]
+    print(
+        f"{args.recommendations} recommendations, {size / 1024:.0f} KiB, "
+        f"orjson {'available' if serialization.orjson is not None else 'missing'}"
+    )
+    for title, variants in groups:
+        print(f"{title}:")
+        baseline = None
+        for name, func in variants:
+            milliseconds = _time(func, args.repeat)
+            baseline = baseline or milliseconds
+            print(
+                f"  {name:<30} {milliseconds:8.2f} ms  {baseline / milliseconds:5.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ Pytest fixtures for FastAPI test client and mock payloads for the annotation eng
 import pytest
 from fastapi.testclient import TestClient
 from webapp.run import app
+from webapp.config import Config
+from webapp.services import core, recommender_client
+from webapp.services.circuit_breaker import CircuitBreaker
 from webapp.models.mock_objects import (
     MOCK_FRONTEND_PAYLOAD,
     MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS,
@@ -33,3 +36,34 @@ def mock_geo_coverage():
     Fixture for providing mock geographic coverage recommendations for tests.
     """
     return MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS
+
+
+@pytest.fixture(autouse=True)
+def clear_recommendation_cache():
+    """
+    Fixture clearing the shared recommendation cache so tests do not see each other's entries.
+    """
+    core._cache.clear()  # pylint: disable=protected-access
+    core._negative_cache.clear()  # pylint: disable=protected-access
+    yield
+    core._cache.clear()  # pylint: disable=protected-access
+    core._negative_cache.clear()  # pylint: disable=protected-access
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breaker(monkeypatch):
+    """
+    Fixture giving each test a closed circuit breaker, so upstream failures simulated by one test
+    do not make later tests fail fast.
+    """
+    monkeypatch.setattr(
+        recommender_client,
+        "breaker",
+        CircuitBreaker(
+            Config.CIRCUIT_BREAKER_FAILURE_RATE,
+            min_calls=Config.CIRCUIT_BREAKER_MIN_CALLS,
+            window=Config.CIRCUIT_BREAKER_WINDOW,
+            slow_call=Config.CIRCUIT_BREAKER_SLOW_CALL,
+            reset_timeout=Config.CIRCUIT_BREAKER_RESET_TIMEOUT,
+        ),
+    )
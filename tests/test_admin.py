@@ -0,0 +1,104 @@
+"""
+Tests for the cache administration endpoints.
+"""
+
+import pytest
+
+from webapp.config import Config
+from webapp.services import core
+from webapp.services.cache import SQLiteRecommendationStore
+
+HEADERS = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture(name="admin")
+def admin_fixture(monkeypatch):
+    """
+    Fixture enabling the admin endpoints and filling the in-memory cache.
+    """
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "secret")
+    cache = core._cache  # pylint: disable=protected-access
+    cache.set("aa01", [{"column_name": "Lat"}], "A.csv")
+    cache.set("aa02", [{"column_name": "Lon"}], "A.csv")
+    cache.set("bb01", [{"column_name": "Depth"}], "B.csv")
+    return cache
+
+
+@pytest.mark.parametrize(
+    "token, enabled, status",
+    [(None, True, 401), ("wrong", True, 401), ("secret", False, 403)],
+)
+def test_admin_endpoints_require_token(client, monkeypatch, token, enabled, status):
+    """
+    Test that the admin endpoints reject missing or wrong tokens and are off by default.
+    """
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "secret" if enabled else "")
+    headers = {"X-Admin-Token": token} if token else {}
+    assert client.get("/api/admin/cache", headers=headers).status_code == status
+    assert (
+        client.delete("/api/admin/cache?all=true", headers=headers).status_code
+        == status
+    )
+
+
+def test_cache_stats(client, admin):
+    """
+    Test that the stats endpoint reports counters and sizes per tier.
+    """
+    admin.memory.get("aa01")
+    admin.memory.get("zz99")
+    response = client.get("/api/admin/cache", headers=HEADERS)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["memory"]["entries"] == 3
+    assert stats["memory"]["bytes"] > 0
+    assert (stats["memory"]["hits"], stats["memory"]["misses"]) == (1, 1)
+    assert stats["persistent"] is None
+    assert stats["negative"]["entries"] == 0
+
+
+@pytest.mark.parametrize(
+    "query, removed, remaining",
+    [
+        ("objectName=A.csv", 2, ["bb01"]),
+        ("prefix=aa0", 2, ["bb01"]),
+        ("objectName=A.csv&prefix=aa02", 1, ["aa01", "bb01"]),
+        ("all=true", 3, []),
+    ],
+)
+def test_purge(client, admin, query, removed, remaining):
+    """
+    Test purging by objectName, by content hash prefix and of everything.
+    """
+    response = client.delete(f"/api/admin/cache?{query}", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json()["purged"]["memory"] == removed
+    assert [key for key in ("aa01", "aa02", "bb01") if admin.memory.get(key)] == (
+        remaining
+    )
+
+
+@pytest.mark.parametrize("query", ["", "prefix=XYZ"])
+def test_purge_rejects_missing_or_bad_filter(client, admin, query):
+    """
+    Test that a purge without a filter or with a non-hex prefix is refused.
+    """
+    response = client.delete(f"/api/admin/cache?{query}", headers=HEADERS)
+    assert response.status_code == 400
+    assert len(admin.memory) == 3
+
+
+def test_sqlite_store_purge_and_stats(tmp_path):
+    """
+    Test that the persistent tier purges queued and stored rows by objectName and prefix.
+    """
+    store = SQLiteRecommendationStore(str(tmp_path / "cache.sqlite3"), ttl=60)
+    store.put("aa01", [], "A.csv")
+    store.put("aa02", [], "A.csv")
+    store.put("bb01", [], "B.csv")
+    assert store.purge(object_name="A.csv", prefix="aa01") == 1
+    assert store.stats()["entries"] == 2
+    assert store.purge(prefix="bb") == 1
+    assert store.purge() == 1
+    assert store.stats()["entries"] == 0
+    store.close()
@@ -0,0 +1,110 @@
+"""
+Tests for cross-request micro-batching of upstream recommender calls.
+"""
+
+import asyncio
+
+import pytest
+
+from webapp.config import Config
+from webapp.services.batching import RecommenderBatcher
+from webapp.services.core import _normalize_recommender_response
+
+
+@pytest.fixture(name="batching")
+def batching_fixture(monkeypatch):
+    """
+    Fixture enabling a short batch window and returning a batcher with a recording upstream.
+    """
+    monkeypatch.setattr(Config, "RECOMMENDER_BATCH_WINDOW", 0.02)
+    monkeypatch.setattr(Config, "RECOMMENDER_MAX_BATCH_SIZE", 100)
+    calls = []
+
+    async def send(payload):
+        calls.append(payload)
+        # Dict-shaped response, as returned by the real recommender
+        return {
+            item["name"]: [{"concept_name": item["objectName"]}] for item in payload
+        }
+
+    return RecommenderBatcher(send, _normalize_recommender_response), calls
+
+
+def _payload(object_name, *names):
+    return [{"name": name, "objectName": object_name} for name in names]
+
+
+def test_concurrent_groups_share_one_upstream_call(batching):
+    """
+    Test that groups submitted within the window are sent together and split back per caller.
+    """
+    batcher, calls = batching
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(_payload("A.csv", "Lat", "Lon"), {"Lat", "Lon"}),
+            batcher.submit(_payload("B.csv", "Depth"), {"Depth"}),
+        )
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 1
+    assert [rec["column_name"] for rec in first] == ["Lat", "Lon"]
+    assert [rec["column_name"] for rec in second] == ["Depth"]
+    assert second[0]["concept_name"] == "B.csv"
+
+
+def test_colliding_columns_start_a_new_batch(batching):
+    """
+    Test that groups sharing a column name are never put in the same upstream call.
+    """
+    batcher, calls = batching
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(_payload("A.csv", "Lat"), {"Lat"}),
+            batcher.submit(_payload("B.csv", "Lat"), {"Lat"}),
+        )
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 2
+    assert first[0]["concept_name"] == "A.csv"
+    assert second[0]["concept_name"] == "B.csv"
+
+
+def test_full_batch_is_sent_before_the_window(batching, monkeypatch):
+    """
+    Test that a batch reaching the maximum size is sent without waiting for the window.
+    """
+    batcher, calls = batching
+    monkeypatch.setattr(Config, "RECOMMENDER_BATCH_WINDOW", 10.0)
+    monkeypatch.setattr(Config, "RECOMMENDER_MAX_BATCH_SIZE", 2)
+
+    async def run():
+        return await asyncio.wait_for(
+            batcher.submit(_payload("A.csv", "Lat", "Lon"), {"Lat", "Lon"}), timeout=1
+        )
+
+    assert len(asyncio.run(run())) == 2
+    assert len(calls) == 1
+
+
+def test_upstream_error_is_raised_to_every_caller(batching):
+    """
+    Test that a failed batched call propagates the error to each caller in the batch.
+    """
+    batcher, _ = batching
+
+    async def send(payload):
+        raise ValueError(f"bad response for {len(payload)} records")
+
+    batcher._send = send  # pylint: disable=protected-access
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(_payload("A.csv", "Lat"), {"Lat"}),
+            batcher.submit(_payload("B.csv", "Lon"), {"Lon"}),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
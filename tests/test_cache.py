@@ -0,0 +1,517 @@
+"""
+Tests for the content-addressed recommendation cache.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+from webapp.config import Config
+from webapp.services import core, recommender_client
+from webapp.services.cache import (
+    BloomFilter,
+    NegativeCache,
+    RecommendationCache,
+    SQLiteRecommendationStore,
+    TieredRecommendationCache,
+    attribute_cache_key,
+)
+from webapp.services.core import recommend_for_attribute
+
+
+def _attribute(name, object_name="A.csv", **extra):
+    return {
+        "id": f"{object_name}-{name}",
+        "name": name,
+        "description": "",
+        "objectName": object_name,
+        **extra,
+    }
+
+
+def test_cache_key_depends_only_on_content_fields():
+    """
+    Test that the cache key ignores ids and context but changes with any hashed field.
+    """
+    first = _attribute("Lat", context="SurveyResults")
+    second = dict(first, id="other-id", context="Other")
+    assert attribute_cache_key(first) == attribute_cache_key(second)
+    assert attribute_cache_key(first) != attribute_cache_key(
+        dict(first, description="x")
+    )
+    assert attribute_cache_key(first) != attribute_cache_key(
+        dict(first, entityDescription="x")
+    )
+
+
+def test_lru_eviction_by_entry_count():
+    """
+    Test that the least recently used entry is evicted first.
+    """
+    cache = RecommendationCache(max_entries=2, max_bytes=10**6, ttl=60)
+    cache.set("a", [{"v": 1}])
+    cache.set("b", [{"v": 2}])
+    assert cache.get("a") == [{"v": 1}]
+    cache.set("c", [{"v": 3}])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.evictions == 1
+
+
+def test_eviction_by_byte_size():
+    """
+    Test that entries are evicted to keep the cache within its byte budget.
+    """
+    cache = RecommendationCache(max_entries=100, max_bytes=40, ttl=60)
+    cache.set("a", [{"v": "x" * 10}])
+    cache.set("b", [{"v": "y" * 10}])
+    assert len(cache) == 1
+    assert cache.size_bytes <= 40
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    """
+    Test that an entry is no longer returned once its TTL has passed.
+    """
+    now = [1000.0]
+    monkeypatch.setattr("webapp.services.cache.time.monotonic", lambda: now[0])
+    cache = RecommendationCache(max_entries=10, max_bytes=10**6, ttl=5)
+    cache.set("a", [])
+    assert cache.get("a") == []
+    now[0] += 6
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_only_cache_misses_go_upstream(monkeypatch):
+    """
+    Test that a repeated request only sends the attributes that are not cached yet.
+    """
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append([item["name"] for item in payload])
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "column_name": item["name"],
+                    "concept_name": item["name"],
+                    "concept_id": "http://purl.dataone.org/odo/ECSO_00002130",
+                    "confidence": 0.9,
+                    "concept_definition": "",
+                }
+                for item in payload
+            ],
+        )
+
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    first = asyncio.run(recommend_for_attribute([_attribute("Lat")], request_id="r1"))
+    second = asyncio.run(
+        recommend_for_attribute([_attribute("Lat"), _attribute("Lon")], request_id="r2")
+    )
+    asyncio.run(recommender_client.close_client())
+    assert calls == [["Lat"], ["Lon"]]
+    assert [item["id"] for item in second] == ["A.csv-Lat", "A.csv-Lon"]
+    assert second[0]["recommendations"][0]["request_id"] == "r2"
+    assert first[0]["recommendations"][0]["request_id"] == "r1"
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    """
+    Test that entries written to the persistent tier are found by a new store on the same file.
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteRecommendationStore(path, ttl=60, flush_interval=0.01)
+    store.put("a", [{"column_name": "Lat"}], "A.csv")
+    store.close()
+    reopened = SQLiteRecommendationStore(path, ttl=60)
+    found = reopened.get_many(["a", "b"])
+    assert list(found) == ["a"]
+    assert found["a"][:2] == ([{"column_name": "Lat"}], "A.csv")
+    mode = reopened._reader.execute(  # pylint: disable=protected-access
+        "PRAGMA journal_mode"
+    ).fetchone()
+    reopened.close()
+    assert mode == ("wal",)
+
+
+def test_sqlite_store_queues_deletes(tmp_path):
+    """
+    Test that a discarded row is hidden from reads right away and deleted by the writer, and that
+    a later write of the key brings it back.
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteRecommendationStore(path, ttl=60, flush_interval=60)
+    store.put("a", [{"column_name": "Lat"}], "A.csv")
+    store.put("b", [{"column_name": "Lon"}], "A.csv")
+    store.flush(store._reader)  # pylint: disable=protected-access
+    store.discard("a")
+    assert list(store.get_many(["a", "b"])) == ["b"]
+    store.discard("b")
+    store.put("b", [{"column_name": "Lon"}], "A.csv")
+    store.close()
+    reopened = SQLiteRecommendationStore(path, ttl=60)
+    assert list(reopened.get_many(["a", "b"])) == ["b"]
+    reopened.close()
+
+
+def test_sqlite_store_ignores_expired_rows(tmp_path):
+    """
+    Test that rows past their TTL are not returned.
+    """
+    store = SQLiteRecommendationStore(str(tmp_path / "cache.sqlite3"), ttl=-1)
+    store.put("a", [], "A.csv")
+    store.close()
+    reopened = SQLiteRecommendationStore(str(tmp_path / "cache.sqlite3"), ttl=60)
+    assert not reopened.get_many(["a"])
+    reopened.close()
+
+
+def test_tiered_cache_promotes_persistent_hits(tmp_path):
+    """
+    Test that a persistent-tier hit is served and copied into the in-memory tier.
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    warm = TieredRecommendationCache(RecommendationCache(10, 10**6, 60))
+    warm.open_store(path, ttl=60)
+    warm.set("a", [{"column_name": "Lat"}], "A.csv")
+    warm.close_store()
+
+    cold = TieredRecommendationCache(RecommendationCache(10, 10**6, 60))
+    cold.open_store(path, ttl=60)
+    found = asyncio.run(cold.get_many(["a", "b"]))
+    cold.close_store()
+    assert found == {"a": ([{"column_name": "Lat"}], False)}
+    assert cold.memory.get("a") == [{"column_name": "Lat"}]
+
+
+def test_expired_entries_are_stale_during_grace(monkeypatch):
+    """
+    Test that an expired entry is returned flagged as stale until its grace period ends.
+    """
+    now = [1000.0]
+    monkeypatch.setattr("webapp.services.cache.time.monotonic", lambda: now[0])
+    cache = RecommendationCache(max_entries=10, max_bytes=10**6, ttl=5, grace=10)
+    cache.set("a", [{"v": 1}])
+    assert cache.lookup("a") == ([{"v": 1}], False)
+    now[0] += 6
+    assert cache.lookup("a") == ([{"v": 1}], True)
+    assert cache.get("a") is None
+    assert cache.stale_hits == 2
+    now[0] += 10
+    assert cache.lookup("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_store_returns_stale_rows_during_grace(tmp_path):
+    """
+    Test that the persistent tier keeps expired rows for the grace period and that the tiered
+    cache reports them as stale.
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteRecommendationStore(path, ttl=-1, grace=60)
+    store.put("a", [{"column_name": "Lat"}], "A.csv")
+    store.close()
+
+    tiered = TieredRecommendationCache(RecommendationCache(10, 10**6, 60, grace=60))
+    tiered.open_store(path, ttl=60, grace=60)
+    found = asyncio.run(tiered.get_many(["a"]))
+    tiered.close_store()
+    assert found == {"a": ([{"column_name": "Lat"}], True)}
+
+
+def test_stale_entries_are_served_and_refreshed(monkeypatch):
+    """
+    Test that stale recommendations are returned at once, flagged as stale, and refreshed in
+    the background so that the next request gets fresh ones.
+    """
+    now = [1000.0]
+    monkeypatch.setattr("webapp.services.cache.time.monotonic", lambda: now[0])
+    concepts = iter(["old", "new"])
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append([item["name"] for item in payload])
+        concept = next(concepts)
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "column_name": item["name"],
+                    "concept_name": concept,
+                    "concept_id": "http://purl.dataone.org/odo/ECSO_00002130",
+                    "confidence": 0.9,
+                    "concept_definition": "",
+                }
+                for item in payload
+            ],
+        )
+
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(
+        core._cache.memory, "grace", 60
+    )  # pylint: disable=protected-access
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def run():
+        await recommend_for_attribute([_attribute("Lat")], request_id="r1")
+        now[0] += Config.RECOMMENDATION_CACHE_TTL + 1
+        stale = await recommend_for_attribute([_attribute("Lat")], request_id="r2")
+        await asyncio.gather(
+            *core._background_groups
+        )  # pylint: disable=protected-access
+        fresh = await recommend_for_attribute([_attribute("Lat")], request_id="r3")
+        await recommender_client.close_client()
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert calls == [["Lat"], ["Lat"]]
+    assert stale[0]["stale"] is True
+    assert stale[0]["recommendations"][0]["label"] == "old"
+    assert "stale" not in fresh[0]
+    assert fresh[0]["recommendations"][0]["label"] == "new"
+
+
+def test_refresh_without_recommendations_drops_stale_entry(monkeypatch, tmp_path):
+    """
+    Test that a stale entry whose refresh comes back empty is removed from both tiers, so later
+    requests neither serve it nor refresh it again.
+    """
+    now = [1000.0]
+    monkeypatch.setattr("webapp.services.cache.time.monotonic", lambda: now[0])
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append([item["name"] for item in payload])
+        if len(calls) > 1:
+            return httpx.Response(200, json={})
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "column_name": item["name"],
+                    "concept_name": "old",
+                    "concept_id": "http://purl.dataone.org/odo/ECSO_00002130",
+                    "confidence": 0.9,
+                    "concept_definition": "",
+                }
+                for item in payload
+            ],
+        )
+
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(
+        core._cache.memory, "grace", 60
+    )  # pylint: disable=protected-access
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    # pylint: disable-next=protected-access
+    core._cache.open_store(str(tmp_path / "cache.sqlite3"), ttl=60, grace=60)
+
+    async def run():
+        await recommend_for_attribute([_attribute("Lat")], request_id="r1")
+        now[0] += Config.RECOMMENDATION_CACHE_TTL + 1
+        stale = await recommend_for_attribute([_attribute("Lat")], request_id="r2")
+        await asyncio.gather(
+            *core._background_groups
+        )  # pylint: disable=protected-access
+        later = [
+            await recommend_for_attribute([_attribute("Lat")], request_id=f"r{i}")
+            for i in range(3, 6)
+        ]
+        await recommender_client.close_client()
+        return stale, later
+
+    try:
+        stale, later = asyncio.run(run())
+        key = attribute_cache_key(_attribute("Lat"))
+        # pylint: disable-next=protected-access
+        assert core._cache.store.get_many([key]) == {}
+    finally:
+        core._cache.close_store()  # pylint: disable=protected-access
+    assert stale[0]["stale"] is True
+    assert later == [[], [], []]
+    assert calls == [["Lat"], ["Lat"]]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """
+    Test that every added key is found and that unrelated keys are rarely reported.
+    """
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [attribute_cache_key(_attribute(f"col{i}")) for i in range(1000)]
+    for key in added:
+        bloom.add(key)
+    assert all(key in bloom for key in added)
+    others = [attribute_cache_key(_attribute(f"other{i}")) for i in range(2000)]
+    assert sum(key in bloom for key in others) < 60
+    assert bloom.size_bytes < 1300
+
+
+def test_negative_cache_forgets_after_two_generations(monkeypatch):
+    """
+    Test that a negative entry survives one rotation and is gone after the second.
+    """
+    now = [1000.0]
+    monkeypatch.setattr("webapp.services.cache.time.monotonic", lambda: now[0])
+    negative = NegativeCache(capacity=100, error_rate=0.01, ttl=10)
+    key = attribute_cache_key(_attribute("Notes"))
+    negative.add(key)
+    assert key in negative
+    now[0] += 11
+    assert key in negative
+    now[0] += 11
+    assert key not in negative
+    assert negative.rotations == 2
+
+
+def test_attributes_without_recommendations_are_not_resent(monkeypatch):
+    """
+    Test that an attribute the recommender had nothing for is left out of later payloads, and
+    that nothing is deleted from the cache for it since it was never cached.
+    """
+    calls = []
+    discarded = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append([item["name"] for item in payload])
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "column_name": item["name"],
+                    "concept_name": item["name"],
+                    "concept_id": "http://purl.dataone.org/odo/ECSO_00002130",
+                    "confidence": 0.9,
+                    "concept_definition": "",
+                }
+                for item in payload
+                if item["name"] != "Notes"
+            ],
+        )
+
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    # pylint: disable-next=protected-access
+    monkeypatch.setattr(core._cache, "discard", discarded.append)
+
+    first = asyncio.run(
+        recommend_for_attribute([_attribute("Lat"), _attribute("Notes")], "r1")
+    )
+    second = asyncio.run(
+        recommend_for_attribute(
+            [_attribute("Lat"), _attribute("Notes"), _attribute("Lon")], "r2"
+        )
+    )
+    asyncio.run(recommender_client.close_client())
+    assert calls == [["Lat", "Notes"], ["Lon"]]
+    assert [item["id"] for item in first] == ["A.csv-Lat"]
+    assert [item["id"] for item in second] == ["A.csv-Lat", "A.csv-Lon"]
+    assert len(core._negative_cache) == 1  # pylint: disable=protected-access
+    assert discarded == []
+
+
+def test_new_model_version_bypasses_old_entries(monkeypatch):
+    """
+    Test that a model version reported by the upstream becomes part of the cache keys, so a new
+    version is not answered from entries of the old one.
+    """
+    versions = iter(["v1", "v2", "v2"])
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append([item["name"] for item in payload])
+        return httpx.Response(
+            200,
+            headers={"X-Model-Version": next(versions)},
+            json=[
+                {
+                    "column_name": item["name"],
+                    "concept_name": item["name"],
+                    "concept_id": "http://purl.dataone.org/odo/ECSO_00002130",
+                    "confidence": 0.9,
+                    "concept_definition": "",
+                }
+                for item in payload
+            ],
+        )
+
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(recommender_client, "_model_version", None)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def run():
+        for name in ("Lat", "Lat", "Lon", "Lat", "Lat"):
+            await recommend_for_attribute([_attribute(name)], "r")
+        await recommender_client.close_client()
+
+    asyncio.run(run())
+    # The first Lat answer was stored under v1 and Lon's answer announced v2
+    assert calls == [["Lat"], ["Lon"], ["Lat"]]
+    assert recommender_client.model_version() == "v2"
+    key = attribute_cache_key(_attribute("Lat"))
+    assert attribute_cache_key(_attribute("Lat"), "v2") != key
+
+
+def test_version_probe(monkeypatch):
+    """
+    Test that the version probe reads the version from a JSON body and keeps the last known
+    version when the probe fails.
+    """
+    answers = iter(
+        [httpx.Response(200, json={"version": "2024.1"}), httpx.Response(503)]
+    )
+    monkeypatch.setattr(Config, "RECOMMENDER_VERSION_URL", "http://recommender.test/v")
+    monkeypatch.setattr(recommender_client, "_model_version", None)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(
+        transport=httpx.MockTransport(lambda request: next(answers))
+    )
+
+    async def run():
+        first = await recommender_client.probe_model_version()
+        second = await recommender_client.probe_model_version()
+        await recommender_client.close_client()
+        return first, second
+
+    assert asyncio.run(run()) == ("2024.1", "2024.1")
+
+
+def test_model_version_survives_restart(monkeypatch, tmp_path):
+    """
+    Test that the persistent tier remembers the last seen model version, so cache keys built
+    right after a restart still match the stored entries.
+    """
+    monkeypatch.setattr(
+        Config, "RECOMMENDATION_CACHE_DB_PATH", str(tmp_path / "cache.sqlite3")
+    )
+    monkeypatch.setattr(recommender_client, "_model_version", None)
+    core.open_recommendation_cache()
+    # pylint: disable-next=protected-access
+    recommender_client._observe_model_version("v3")
+    core.close_recommendation_cache()
+
+    monkeypatch.setattr(recommender_client, "_model_version", None)
+    core.open_recommendation_cache()
+    try:
+        assert recommender_client.model_version() == "v3"
+    finally:
+        core.close_recommendation_cache()
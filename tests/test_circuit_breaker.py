@@ -0,0 +1,103 @@
+"""
+Tests for the circuit breaker around the upstream recommender.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from webapp.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+def _status_error(status_code):
+    request = httpx.Request("POST", "http://recommender.test")
+    return httpx.HTTPStatusError(
+        "error", request=request, response=httpx.Response(status_code, request=request)
+    )
+
+
+def _call(breaker, outcome):
+    async def upstream():
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return asyncio.run(breaker.call(upstream))
+
+
+def test_opens_after_failure_rate_and_fails_fast():
+    """
+    Test that the circuit opens once the failure rate is reached and then fails fast.
+    """
+    breaker = CircuitBreaker(
+        0.5, min_calls=4, window=10, slow_call=10, reset_timeout=60
+    )
+    assert _call(breaker, "ok") == "ok"
+    for _ in range(3):
+        with pytest.raises(httpx.HTTPStatusError):
+            _call(breaker, _status_error(502))
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, "ok")
+
+
+def test_client_errors_do_not_count():
+    """
+    Test that 4xx responses are not held against the upstream.
+    """
+    breaker = CircuitBreaker(
+        0.5, min_calls=2, window=10, slow_call=10, reset_timeout=60
+    )
+    for _ in range(4):
+        with pytest.raises(httpx.HTTPStatusError):
+            _call(breaker, _status_error(422))
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures(monkeypatch):
+    """
+    Test that successful calls slower than the threshold count as failures.
+    """
+    now = [0.0]
+
+    def monotonic():
+        now[0] += 5
+        return now[0]
+
+    monkeypatch.setattr("webapp.services.circuit_breaker.time.monotonic", monotonic)
+    breaker = CircuitBreaker(1.0, min_calls=2, window=10, slow_call=1, reset_timeout=60)
+    _call(breaker, "ok")
+    _call(breaker, "ok")
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_or_reopens(monkeypatch):
+    """
+    Test that a single probe is let through after the reset timeout and decides the state.
+    """
+    now = [0.0]
+    monkeypatch.setattr(
+        "webapp.services.circuit_breaker.time.monotonic", lambda: now[0]
+    )
+    breaker = CircuitBreaker(
+        1.0, min_calls=1, window=10, slow_call=10, reset_timeout=30
+    )
+    with pytest.raises(httpx.ConnectError):
+        _call(breaker, httpx.ConnectError("down"))
+    assert breaker.state == OPEN
+    now[0] = 31
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    now[0] = 62
+    assert _call(breaker, "ok") == "ok"
+    assert breaker.state == CLOSED
@@ -0,0 +1,152 @@
+"""
+Tests for compressed responses and compressed upstream request bodies.
+"""
+
+import asyncio
+import copy
+import gzip
+import json
+
+import brotli
+import httpx
+import pytest
+
+from webapp.config import Config
+from webapp.services import recommender_client
+from webapp.utils.compression import StreamCompressor, negotiate_encoding
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    """
+    Test that the best accepted content coding is chosen, honouring q-values.
+    """
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_streamed_parts_decode_as_they_arrive(encoding):
+    """
+    Test that each flushed part can be decoded before the stream is finished.
+    """
+    compressor = StreamCompressor(encoding, 5)
+    if encoding == "gzip":
+        decode = gzip.zlib.decompressobj(16 + gzip.zlib.MAX_WBITS).decompress
+    else:
+        decode = brotli.Decompressor().process
+    assert decode(compressor.compress(b'{"id": 1}\n', final=False)) == b'{"id": 1}\n'
+    assert decode(compressor.compress(b'{"id": 2}\n', final=True)) == b'{"id": 2}\n'
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_recommendations_response_is_compressed(client, mock_payload, encoding):
+    """
+    Test that a large recommendations response is compressed with the accepted coding.
+    """
+    response = client.post(
+        "/api/recommendations",
+        json=copy.deepcopy(mock_payload),
+        headers={"Accept-Encoding": encoding},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json()
+
+
+def test_small_response_is_not_compressed(client):
+    """
+    Test that responses below the minimum size are sent as they are.
+    """
+    response = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+
+
+def test_streamed_response_is_compressed(client, mock_payload):
+    """
+    Test that NDJSON streams are compressed too.
+    """
+    response = client.post(
+        "/api/recommendations?stream=true",
+        json=copy.deepcopy(mock_payload),
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    lines = response.text.splitlines()
+    assert lines and all(json.loads(line)["id"] for line in lines)
+
+
+def test_upstream_request_body_is_compressed(monkeypatch):
+    """
+    Test that upstream bodies above the minimum size are sent compressed when enabled.
+    """
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request.headers.get("content-encoding"))
+        body = request.content
+        if request.headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        return httpx.Response(200, json=[{"column_name": json.loads(body)[0]["name"]}])
+
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(Config, "RECOMMENDER_REQUEST_COMPRESSION", "gzip")
+    monkeypatch.setattr(Config, "RECOMMENDER_REQUEST_COMPRESSION_MINIMUM_SIZE", 100)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def run():
+        small = await recommender_client.post_recommendations([{"name": "Lat"}])
+        large = await recommender_client.post_recommendations(
+            [{"name": "Lon", "description": "x" * 200}]
+        )
+        await recommender_client.close_client()
+        return small, large
+
+    small, large = asyncio.run(run())
+    assert received == [None, "gzip"]
+    assert (small[0]["column_name"], large[0]["column_name"]) == ("Lat", "Lon")
+
+
+def test_unsupported_request_compression_is_a_local_error(monkeypatch):
+    """
+    Test that an unsupported upstream coding is rejected when the client opens, and that failing
+    to encode a body counts against neither the replica nor the circuit breaker.
+    """
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(Config, "RECOMMENDER_REQUEST_COMPRESSION", "zstd")
+    monkeypatch.setattr(Config, "RECOMMENDER_REQUEST_COMPRESSION_MINIMUM_SIZE", 0)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    monkeypatch.setattr(recommender_client, "_replicas", None)
+    with pytest.raises(ValueError):
+        recommender_client.open_client()
+
+    monkeypatch.setattr(Config, "RECOMMENDER_REQUEST_COMPRESSION", "")
+    recommender_client.open_client(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+    )
+    monkeypatch.setattr(Config, "RECOMMENDER_REQUEST_COMPRESSION", "zstd")
+
+    async def run():
+        try:
+            with pytest.raises(ValueError):
+                await recommender_client.post_recommendations([{"name": "Lat"}])
+        finally:
+            await recommender_client.close_client()
+
+    asyncio.run(run())
+    assert recommender_client.get_replicas().replicas[0].errors == 0
+    # pylint: disable-next=protected-access
+    assert not recommender_client.breaker._outcomes
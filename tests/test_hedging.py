@@ -0,0 +1,106 @@
+"""
+Tests for hedged upstream requests.
+"""
+
+import asyncio
+
+from webapp.services.hedging import HedgeBudget, LatencyTracker, hedged
+
+
+def test_latency_percentile_needs_enough_samples():
+    """
+    Test that no percentile is reported until the minimum number of samples is recorded.
+    """
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i / 10)
+    assert tracker.percentile(95) is None
+    tracker.record(0.9)
+    assert tracker.percentile(95) == 0.9
+    assert tracker.percentile(50) == 0.4
+
+
+def test_hedge_budget_caps_extra_load():
+    """
+    Test that the budget allows about one hedge per ``1 / max_ratio`` requests.
+    """
+    budget = HedgeBudget(max_ratio=0.25)
+    granted = 0
+    for _ in range(100):
+        budget.on_request()
+        granted += budget.try_acquire()
+    assert granted == 25
+
+
+def _budget():
+    budget = HedgeBudget(max_ratio=1.0)
+    budget.tokens = 1.0
+    return budget
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    """
+    Test that a duplicate is sent after the delay, the faster answer wins and the slow attempt is
+    cancelled.
+    """
+    cancelled = []
+
+    async def call(attempt):
+        try:
+            await asyncio.sleep(5 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return attempt
+
+    async def run():
+        result = await hedged(call, 0.01, _budget())
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 1
+    assert cancelled == [0]
+
+
+def test_fast_call_is_not_hedged():
+    """
+    Test that no duplicate is sent when the call answers within the delay.
+    """
+    attempts = []
+
+    async def call(attempt):
+        attempts.append(attempt)
+        return "ok"
+
+    assert asyncio.run(hedged(call, 1.0, _budget())) == "ok"
+    assert attempts == [0]
+
+
+def test_exhausted_budget_skips_hedge():
+    """
+    Test that a slow call is not hedged once the budget is spent.
+    """
+    attempts = []
+
+    async def call(attempt):
+        attempts.append(attempt)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(hedged(call, 0.01, HedgeBudget(max_ratio=0.1))) == "ok"
+    assert attempts == [0]
+
+
+def test_failed_attempt_waits_for_the_other():
+    """
+    Test that a failing attempt does not fail the call while the other attempt can still succeed.
+    """
+
+    async def call(attempt):
+        if attempt == 0:
+            await asyncio.sleep(0.02)
+            raise ValueError("upstream error")
+        await asyncio.sleep(0.05)
+        return "hedge"
+
+    assert asyncio.run(hedged(call, 0.01, _budget())) == "hedge"
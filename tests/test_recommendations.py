@@ -3,18 +3,27 @@ Unit and integration tests for the recommendations API and utility functions.
 """
 
 from typing import Any, Dict, List
+import asyncio
 import json
 import re
 import copy
+import time
 import pytest
 from webapp.run import (
     recommend_for_attribute,
     recommend_for_geographic_coverage,
 )
+from webapp.config import Config
+from webapp.services import registry
+from webapp.services.registry import RecommenderEntry, get_recommender
 from webapp.utils.utils import (
+    ConceptTable,
+    chunk_items,
+    compact_attribute_elements,
     reformat_attribute_elements,
     reformat_geographic_coverage_elements,
     extract_ontology,
+    merge_recommender_results,
 )
 
 
@@ -25,7 +34,9 @@ def test_recommend_for_attribute_unit(mock_payload: Dict[str, Any]) -> None:
     Checks that the output structure and content are as expected.
     """
     attributes = mock_payload["ATTRIBUTE"]
-    results = recommend_for_attribute(attributes, request_id="test-uuid-1234")
+    results = asyncio.run(
+        recommend_for_attribute(attributes, request_id="test-uuid-1234")
+    )
     print(json.dumps(results, indent=2))
     assert isinstance(results, list)
     assert len(results) == 35
@@ -54,7 +65,9 @@ def test_recommend_for_geographic_coverage_unit(
     Checks that the output matches the mock_geo_coverage fixture.
     """
     geos = [{"description": "Lake Tahoe region", "objectName": "LakeTahoe"}]
-    results = recommend_for_geographic_coverage(geos, request_id="test-uuid-5678")
+    results = asyncio.run(
+        recommend_for_geographic_coverage(geos, request_id="test-uuid-5678")
+    )
     assert isinstance(results, list)
     for item in results:
         for rec in item.get("recommendations", []):
@@ -207,3 +220,298 @@ def test_extract_ontology(uri: str, expected: str) -> None:
     """
 
     assert extract_ontology(uri) == expected
+
+
+@pytest.mark.parametrize(
+    "params,headers",
+    [
+        ({"stream": "true"}, {}),
+        ({}, {"Accept": "application/x-ndjson"}),
+    ],
+)
+def test_recommendations_endpoint_ndjson_stream(
+    client: Any, mock_payload: Dict[str, Any], params, headers
+) -> None:
+    """
+    Integration test: the opt-in NDJSON mode streams one merged result per line, with the same
+    results as the default JSON response.
+    """
+    response = client.post(
+        "/api/recommendations", json=mock_payload, params=params, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    expected = client.post("/api/recommendations", json=mock_payload).json()
+    for item in streamed + expected:
+        for rec in item["recommendations"]:
+            rec["request_id"] = "SNAPSHOT_REQUEST_ID"
+    assert sorted(streamed, key=lambda x: x["id"]) == sorted(
+        expected, key=lambda x: x["id"]
+    )
+
+
+def test_recommendations_endpoint_dispatches_types_concurrently(
+    client: Any, monkeypatch
+) -> None:
+    """
+    Integration test: recognized EML types are recommended at the same time, results keep the
+    type order, and the overall request deadline is enforced.
+    """
+    started = []
+
+    async def slow_attribute(attributes, request_id=None, **options):
+        started.append("ATTRIBUTE")
+        await asyncio.sleep(0.1)
+        return [{"id": "attr", "recommendations": []}]
+
+    async def slow_geo(geos, request_id=None, **options):
+        started.append("GEOGRAPHICCOVERAGE")
+        await asyncio.sleep(0.1)
+        return [{"id": "geo", "recommendations": []}]
+
+    monkeypatch.setattr(get_recommender("ATTRIBUTE"), "recommend", slow_attribute)
+    monkeypatch.setattr(get_recommender("GEOGRAPHICCOVERAGE"), "recommend", slow_geo)
+    payload = {"GEOGRAPHICCOVERAGE": [], "ATTRIBUTE": []}
+
+    monkeypatch.setattr(Config, "RECOMMENDATION_REQUEST_TIMEOUT", 0.15)
+    response = client.post("/api/recommendations", json=payload)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == ["attr", "geo"]
+
+    monkeypatch.setattr(Config, "RECOMMENDATION_REQUEST_TIMEOUT", 0.05)
+    response = client.post("/api/recommendations", json=payload)
+    assert response.status_code == 504
+
+
+def test_registry_dispatches_every_registered_type(client: Any, monkeypatch) -> None:
+    """
+    Integration test: DATATABLE elements reach their registered recommender, entries apply their
+    own merge config and timeout, and unregistered types are ignored.
+    """
+    seen = {}
+
+    async def datatable(tables, request_id=None, **options):
+        seen.update(options)
+        return [{"id": table["id"], "recommendations": []} for table in tables]
+
+    async def hanging(elements, request_id=None, **options):
+        await asyncio.sleep(10)
+
+    entry = RecommenderEntry(
+        "DATATABLE",
+        datatable,
+        merge_config={"property_label": "is about"},
+        max_concurrency=2,
+    )
+    # pylint: disable-next=protected-access
+    monkeypatch.setitem(registry._REGISTRY, "DATATABLE", entry)
+    monkeypatch.setattr(get_recommender("GEOGRAPHICCOVERAGE"), "recommend", hanging)
+    monkeypatch.setattr(get_recommender("GEOGRAPHICCOVERAGE"), "timeout", 0.05)
+    response = client.post(
+        "/api/recommendations",
+        json={
+            "DATATABLE": [{"id": "t1"}],
+            "GEOGRAPHICCOVERAGE": [{"id": "g1"}],
+            "OTHER": [],
+        },
+    )
+    assert response.status_code == 200
+    # The timed-out type's elements are reported as skipped rather than dropped
+    assert response.json() == [
+        {"id": "g1", "recommendations": [], "status": "skipped"},
+        {"id": "t1", "recommendations": []},
+    ]
+    assert seen["max_concurrency"] == 2
+    assert seen["merge_config"] == {"property_label": "is about"}
+    # Entries read the cache unless their settings turn it off
+    assert seen["use_cache"] is True
+
+
+def test_streaming_entry_timeout(client: Any, monkeypatch) -> None:
+    """
+    Integration test: a streaming recommender is bound by its entry's timeout, and the elements
+    it has not yielded by then are streamed as skipped.
+    """
+
+    async def slow_stream(attributes, request_id=None, **options):
+        yield [{"id": "a1", "recommendations": []}]
+        await asyncio.sleep(5)
+        yield [{"id": "a2", "recommendations": []}]
+
+    monkeypatch.setattr(get_recommender("ATTRIBUTE"), "stream", slow_stream)
+    monkeypatch.setattr(get_recommender("ATTRIBUTE"), "timeout", 0.1)
+    response = client.post(
+        "/api/recommendations",
+        json={"ATTRIBUTE": [{"id": "a1"}, {"id": "a2"}]},
+        params={"stream": "true"},
+    )
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": "a1", "recommendations": []},
+        {"id": "a2", "recommendations": [], "status": "skipped"},
+    ]
+
+
+def test_streaming_request_deadline(client: Any, monkeypatch) -> None:
+    """
+    Integration test: NDJSON responses are bound by the overall request deadline, and the results
+    still missing by then are streamed as skipped.
+    """
+
+    async def slow_stream(attributes, request_id=None, **options):
+        await asyncio.sleep(5)
+        yield []
+
+    monkeypatch.setattr(get_recommender("ATTRIBUTE"), "stream", slow_stream)
+    monkeypatch.setattr(Config, "RECOMMENDATION_REQUEST_TIMEOUT", 0.1)
+    start = time.monotonic()
+    response = client.post(
+        "/api/recommendations",
+        json={"ATTRIBUTE": [{"id": "a1"}]},
+        params={"stream": "true"},
+    )
+    assert time.monotonic() - start < 2
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": "a1", "recommendations": [], "status": "skipped"}
+    ]
+
+
+@pytest.mark.parametrize(
+    "budget,status_code", [("3", 200), ("2.5s", 200), ("soon", 400)]
+)
+def test_recommendations_endpoint_budget_header(
+    client: Any, mock_payload: Dict[str, Any], budget: str, status_code: int
+) -> None:
+    """
+    Integration test: a latency budget header marks every result with its status, and an invalid
+    budget is rejected.
+    """
+    response = client.post(
+        "/api/recommendations",
+        json=copy.deepcopy(mock_payload),
+        headers={"X-Request-Budget": budget},
+    )
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert {item["status"] for item in response.json()} == {"complete"}
+
+
+@pytest.mark.parametrize(
+    "items,max_items,max_bytes,expected",
+    [
+        (["a", "b", "c", "d", "e"], 2, 100, [["a", "b"], ["c", "d"], ["e"]]),
+        (["aaa", "bb", "c", "dddd"], 10, 4, [["aaa"], ["bb", "c"], ["dddd"]]),
+        (["aaaaaa", "b"], 10, 4, [["aaaaaa"], ["b"]]),
+        ([], 2, 100, []),
+    ],
+)
+def test_chunk_items(items, max_items, max_bytes, expected) -> None:
+    """
+    Test chunk_items utility function for count and size bounds and order preservation.
+    """
+    assert chunk_items(items, max_items, max_bytes, size_of=len) == expected
+
+
+def test_compact_attribute_elements() -> None:
+    """
+    Test compact_attribute_elements sends entity text once per file and drops duplicate columns.
+    """
+    entity = "Table contains survey information. " * 20
+    attributes = [
+        {
+            "id": f"{object_name}-{name}",
+            "name": name,
+            "description": f"{name} of collection",
+            "entityDescription": entity,
+            "objectName": object_name,
+            "context": "SurveyResults",
+        }
+        for object_name in ("A.csv", "B.csv")
+        for name in ("Latitude", "Longitude", "Latitude")
+    ]
+    out = compact_attribute_elements(attributes)
+    assert out["entities"] == [
+        {"entity_name": "A.csv", "entity_description": entity, "object_name": "A.csv"},
+        {"entity_name": "B.csv", "entity_description": entity, "object_name": "B.csv"},
+    ]
+    assert [(col["entity"], col["column_name"]) for col in out["columns"]] == [
+        (0, "Latitude"),
+        (0, "Longitude"),
+        (1, "Latitude"),
+        (1, "Longitude"),
+    ]
+    assert len(json.dumps(out)) * 2 < len(json.dumps(attributes))
+
+
+def test_merge_recommender_results_concept_table() -> None:
+    """
+    Test merge_recommender_results lists each concept and property once in the concept table and
+    refers to them by index.
+    """
+    attributes = [
+        {"id": "a", "name": "Depth", "objectName": "A.csv"},
+        {"id": "b", "name": "Depth", "objectName": "B.csv"},
+    ]
+    recommender_items = [
+        {
+            "column_name": "Depth",
+            "concept_name": "depth",
+            "concept_id": "http://purl.obolibrary.org/obo/PATO_0001595",
+            "confidence": 0.9,
+            "concept_definition": "A spatial quality.",
+        }
+    ]
+    table = ConceptTable()
+    results = merge_recommender_results(
+        attributes, recommender_items, "ATTRIBUTE", table=table
+    )
+    assert len(table.concepts) == 1
+    assert table.concepts[0]["ontology"] == "PATO"
+    assert len(table.properties) == 1
+    assert [(item["id"], item["objectName"]) for item in results] == [
+        ("a", "A.csv"),
+        ("b", "B.csv"),
+    ]
+    for item in results:
+        assert item["attributeName"] == "Depth"
+        assert item["recommendations"] == [
+            {"concept": 0, "property": 0, "confidence": 0.9}
+        ]
+
+
+@pytest.mark.usefixtures("client", "mock_payload")
+def test_recommendations_endpoint_concept_table_shape(
+    client: Any, mock_payload: Dict[str, Any]
+) -> None:
+    """
+    Test ?shape=table returns the normalized shape, which expands back to the default response.
+    """
+    default = client.post("/api/recommendations", json=mock_payload).json()
+    response = client.post("/api/recommendations?shape=table", json=mock_payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert re.match(r"^[a-f0-9\-]{36}$", data["request_id"])
+    concept_keys = [(c["uri"], c["label"], c["description"]) for c in data["concepts"]]
+    assert len(concept_keys) == len(set(concept_keys))
+    assert len(response.content) < len(json.dumps(default))
+    expanded = [
+        {
+            "id": item["id"],
+            "recommendations": [
+                {
+                    **data["concepts"][rec["concept"]],
+                    **data["properties"][rec["property"]],
+                    "confidence": rec["confidence"],
+                }
+                for rec in item["recommendations"]
+            ],
+        }
+        for item in data["results"]
+    ]
+    for item in default:
+        for rec in item["recommendations"]:
+            for field in ("request_id", "attributeName", "objectName"):
+                rec.pop(field, None)
+    assert expanded == default
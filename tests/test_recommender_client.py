@@ -0,0 +1,369 @@
+"""
+Tests for the pooled recommender HTTP client and the real (non-mock) attribute recommender path.
+"""
+
+import asyncio
+import copy
+import json
+
+import httpx
+import pytest
+
+from webapp.config import Config
+from webapp.services import recommender_client
+from webapp.services.hedging import HedgeBudget, LatencyTracker
+from webapp.services.core import (
+    iter_recommendations_for_attribute,
+    recommend_for_attribute,
+)
+
+
+def _attributes():
+    return [
+        {"id": "a1", "name": "Latitude", "description": "Lat", "objectName": "A.csv"},
+        {"id": "a2", "name": "Longitude", "description": "Lon", "objectName": "A.csv"},
+        {"id": "b1", "name": "Depth", "description": "Depth", "objectName": "B.csv"},
+    ]
+
+
+def _recommend(name):
+    return {
+        "column_name": name,
+        "concept_name": f"{name} concept",
+        "concept_id": "http://purl.dataone.org/odo/ECSO_00002130",
+        "confidence": 0.9,
+        "concept_definition": "",
+    }
+
+
+@pytest.fixture(name="upstream")
+def upstream_fixture(monkeypatch):
+    """
+    Fixture that routes the recommender client to an in-process mock transport and records the
+    upstream payloads it receives.
+    """
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append(payload)
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(Config, "RECOMMENDER_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    yield calls
+    asyncio.run(recommender_client.close_client())
+
+
+def test_client_is_reused_across_calls(upstream):
+    """
+    Test that every upstream call of a request goes through the same pooled client.
+    """
+    client = recommender_client.get_client()
+    results = asyncio.run(recommend_for_attribute(_attributes(), request_id="req-1"))
+    assert recommender_client.get_client() is client
+    assert len(upstream) == 2
+    assert [item["id"] for item in results] == ["a1", "a2", "b1"]
+    for item in results:
+        for rec in item["recommendations"]:
+            assert rec["request_id"] == "req-1"
+            assert "id" not in rec
+
+
+def test_upstream_error_skips_file_group(monkeypatch, upstream):
+    """
+    Test that an upstream error status skips only the failing file group and reports its
+    attributes as skipped.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        upstream.append(payload)
+        if payload[0]["objectName"] == "A.csv":
+            return httpx.Response(502)
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    results = asyncio.run(recommend_for_attribute(_attributes(), request_id="req-2"))
+    assert [item["id"] for item in results] == ["a1", "a2", "b1"]
+    assert results[0] == {"id": "a1", "recommendations": [], "status": "skipped"}
+    assert results[2]["recommendations"]
+
+
+def test_close_client_releases_client():
+    """
+    Test that closing the client resets the module-level instance.
+    """
+    recommender_client.open_client()
+    asyncio.run(recommender_client.close_client())
+    assert recommender_client._client is None  # pylint: disable=protected-access
+
+
+def test_file_groups_are_sent_concurrently(monkeypatch, upstream):
+    """
+    Test that file groups are sent concurrently up to the configured limit and that results keep
+    the deterministic objectName order.
+    """
+    state = {"active": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        upstream.append(payload)
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        # Later files answer first, so completion order differs from submission order
+        await asyncio.sleep(0.05 / len(upstream))
+        state["active"] -= 1
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    attributes = [
+        {
+            "id": f"id-{i}",
+            "name": f"col{i}",
+            "description": "",
+            "objectName": f"{i:02d}.csv",
+        }
+        for i in range(6)
+    ]
+    monkeypatch.setattr(Config, "RECOMMENDER_MAX_CONCURRENCY", 3)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    results = asyncio.run(recommend_for_attribute(attributes, request_id="req-3"))
+    assert state["peak"] == 3
+    assert [item["id"] for item in results] == [f"id-{i}" for i in range(6)]
+
+
+def test_iter_recommendations_yields_in_completion_order(monkeypatch, upstream):
+    """
+    Test that the streaming variant yields each file group as soon as it completes.
+    """
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        upstream.append(payload)
+        await asyncio.sleep(0.05 if payload[0]["objectName"] == "A.csv" else 0)
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def collect():
+        return [
+            [item["id"] for item in file_results]
+            async for file_results in iter_recommendations_for_attribute(
+                _attributes(), request_id="req-4"
+            )
+        ]
+
+    assert asyncio.run(collect()) == [["b1"], ["a1", "a2"]]
+
+
+def test_open_circuit_fails_fast_with_skipped_elements(upstream):
+    """
+    Test that no upstream call is made while the circuit is open and every element is reported
+    as skipped.
+    """
+    for _ in range(Config.CIRCUIT_BREAKER_MIN_CALLS):
+        recommender_client.breaker.record(False)
+    results = asyncio.run(recommend_for_attribute(_attributes(), request_id="req-5"))
+    assert not upstream
+    assert [item["status"] for item in results] == ["skipped"] * 3
+
+
+def test_budget_returns_ready_groups_and_marks_pending(monkeypatch, upstream):
+    """
+    Test that a latency budget returns the finished groups as complete, reports the slow group as
+    pending, and lets the slow group finish in the background to fill the cache.
+    """
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        upstream.append(payload)
+        await asyncio.sleep(0.2 if payload[0]["objectName"] == "A.csv" else 0)
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def run():
+        deadline = asyncio.get_running_loop().time() + 0.05
+        first = await recommend_for_attribute(
+            _attributes(), request_id="req-6", deadline=deadline
+        )
+        await asyncio.sleep(0.3)
+        deadline = asyncio.get_running_loop().time() + 0.05
+        second = await recommend_for_attribute(
+            _attributes(), request_id="req-7", deadline=deadline
+        )
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert [(item["id"], item["status"]) for item in first] == [
+        ("a1", "pending"),
+        ("a2", "pending"),
+        ("b1", "complete"),
+    ]
+    assert first[0]["recommendations"] == []
+    assert [item["status"] for item in second] == ["complete"] * 3
+    assert len(upstream) == 2
+
+
+def test_wide_table_is_sent_in_chunks(monkeypatch, upstream):
+    """
+    Test that a wide table is split into bounded chunks, reassembled in order, and that a failed
+    chunk only skips its own attributes.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        upstream.append(payload)
+        if payload[0]["name"] == "col2":
+            # Not a retryable status, so the chunk fails on its first attempt
+            return httpx.Response(500)
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    attributes = [
+        {
+            "id": f"id-{i}",
+            "name": f"col{i}",
+            "description": "",
+            "objectName": "Wide.csv",
+        }
+        for i in range(5)
+    ]
+    monkeypatch.setattr(Config, "RECOMMENDER_MAX_CHUNK_ATTRIBUTES", 2)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    results = asyncio.run(recommend_for_attribute(attributes, request_id="req-8"))
+    assert sorted(len(payload) for payload in upstream) == [1, 2, 2]
+    assert [(item["id"], item.get("status")) for item in results] == [
+        ("id-0", None),
+        ("id-1", None),
+        ("id-4", None),
+        ("id-2", "skipped"),
+        ("id-3", "skipped"),
+    ]
+
+
+def test_transient_upstream_error_is_retried(monkeypatch, upstream):
+    """
+    Test that a file group whose upstream call fails transiently is retried and recovers.
+    """
+    failures = {"B.csv": 2}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        upstream.append(payload)
+        object_name = payload[0]["objectName"]
+        if failures.get(object_name):
+            failures[object_name] -= 1
+            return httpx.Response(503)
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    results = asyncio.run(recommend_for_attribute(_attributes(), request_id="req-9"))
+    assert len(upstream) == 4
+    assert all(item["recommendations"] for item in results)
+
+
+def test_identical_concurrent_requests_share_upstream_calls(upstream):
+    """
+    Test that concurrent requests for the same attributes send each upstream payload once and
+    that each request gets results with its own request_id.
+    """
+
+    async def run():
+        return await asyncio.gather(
+            recommend_for_attribute(
+                _attributes(), request_id="req-10", use_cache=False
+            ),
+            recommend_for_attribute(
+                _attributes(), request_id="req-11", use_cache=False
+            ),
+        )
+
+    first, second = asyncio.run(run())
+    assert len(upstream) == 2
+    assert {rec["request_id"] for item in first for rec in item["recommendations"]} == {
+        "req-10"
+    }
+    assert {
+        rec["request_id"] for item in second for rec in item["recommendations"]
+    } == {"req-11"}
+
+
+def test_upstream_payload_formats(monkeypatch, upstream):
+    """
+    Test that only the fields the recommender uses are sent, and that the compact format sends
+    each file's entity once.
+    """
+    attributes = [dict(item, context="Survey") for item in _attributes()]
+    asyncio.run(recommend_for_attribute(copy.deepcopy(attributes), request_id="r1"))
+    assert upstream[0] == [
+        {"name": "Latitude", "description": "Lat", "objectName": "A.csv"},
+        {"name": "Longitude", "description": "Lon", "objectName": "A.csv"},
+    ]
+
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        payloads.append(payload)
+        return httpx.Response(
+            200, json=[_recommend(col["column_name"]) for col in payload["columns"]]
+        )
+
+    monkeypatch.setattr(Config, "RECOMMENDER_PAYLOAD_FORMAT", "compact")
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+    results = asyncio.run(
+        recommend_for_attribute(attributes, request_id="r2", use_cache=False)
+    )
+    entities = sorted(
+        entity["object_name"] for payload in payloads for entity in payload["entities"]
+    )
+    assert entities == ["A.csv", "B.csv"]
+    assert all(item["recommendations"] for item in results)
+
+
+def test_slow_upstream_call_is_hedged(monkeypatch):
+    """
+    Test that with hedging enabled a call slower than the latency percentile is duplicated and
+    answered by the faster attempt.
+    """
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        # The first attempt stalls; the hedge answers straight away
+        await asyncio.sleep(5 if len(calls) == 1 else 0)
+        payload = json.loads(request.content)
+        return httpx.Response(200, json=[_recommend(item["name"]) for item in payload])
+
+    latencies = LatencyTracker(window=10, min_samples=1)
+    latencies.record(0.01)
+    budget = HedgeBudget(max_ratio=1.0)
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(Config, "RECOMMENDER_HEDGING", True)
+    monkeypatch.setattr(Config, "RECOMMENDER_HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(recommender_client, "latencies", latencies)
+    monkeypatch.setattr(recommender_client, "hedge_budget", budget)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def run():
+        try:
+            return await asyncio.wait_for(
+                recommender_client.post_recommendations([{"name": "Depth"}]), timeout=2
+            )
+        finally:
+            await recommender_client.close_client()
+
+    assert asyncio.run(run())[0]["column_name"] == "Depth"
+    assert len(calls) == 2
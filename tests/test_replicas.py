@@ -0,0 +1,126 @@
+"""
+Tests for load balancing across recommender replicas.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+from webapp.config import Config
+from webapp.services import recommender_client
+from webapp.services.replicas import ReplicaPool
+
+URLS = ["http://replica-a.test/api/annotate", "http://replica-b.test/api/annotate"]
+
+
+def _pool(**kwargs):
+    options = {"alpha": 0.5, "max_failures": 2, "ejection_time": 30.0}
+    options.update(kwargs)
+    return ReplicaPool(URLS, **options)
+
+
+def test_unmeasured_replica_is_tried_first():
+    """
+    Test that a replica without a latency estimate is preferred over a measured one.
+    """
+    pool = _pool()
+    first, second = pool.replicas
+    pool.record_success(first, 0.2)
+    assert pool.choose() is second
+
+
+def test_concurrent_calls_spread_over_unmeasured_replicas():
+    """
+    Test that calls in flight count before any latency is known, so concurrent calls on a fresh
+    pool, or after a replica hangs on its first call, are spread over the replicas.
+    """
+    pool = ReplicaPool(
+        ["http://a.test", "http://b.test", "http://c.test"],
+        alpha=0.5,
+        max_failures=2,
+        ejection_time=30.0,
+    )
+    chosen = []
+    for _ in range(6):
+        replica = pool.choose()
+        replica.in_flight += 1
+        chosen.append(replica.url)
+    assert sorted(chosen) == sorted(pool.urls * 2)
+
+    hanging, measured, _ = pool.replicas
+    for replica in pool.replicas:
+        replica.in_flight = 0
+    hanging.in_flight = 1
+    pool.record_success(measured, 0.5)
+    assert pool.choose() is not hanging
+
+
+def test_faster_less_loaded_replica_is_chosen():
+    """
+    Test that selection weighs the latency estimate by the calls in flight.
+    """
+    pool = _pool()
+    fast, slow = pool.replicas
+    pool.record_success(fast, 0.1)
+    pool.record_success(slow, 0.3)
+    assert pool.choose() is fast
+    fast.in_flight = 3
+    assert pool.choose() is slow
+
+
+def test_failing_replica_is_ejected():
+    """
+    Test that consecutive failures eject a replica and that it is still used when it is the only
+    one left.
+    """
+    pool = _pool()
+    bad, good = pool.replicas
+    pool.record_success(bad, 0.01)
+    pool.record_success(good, 1.0)
+    pool.record_failure(bad)
+    assert pool.choose() is bad
+    pool.record_failure(bad)
+    assert pool.choose() is good
+    assert bad.errors == 2
+    assert pool.choose(avoid=[good]) is good
+
+
+def test_calls_fail_over_to_the_healthy_replica(monkeypatch):
+    """
+    Test that upstream calls stop going to a replica that keeps failing.
+    """
+    hosts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "replica-a.test":
+            return httpx.Response(503)
+        payload = json.loads(request.content)
+        return httpx.Response(
+            200, json=[{"column_name": item["name"]} for item in payload]
+        )
+
+    monkeypatch.setattr(Config, "API_URLS", URLS)
+    monkeypatch.setattr(Config, "RECOMMENDER_EJECTION_FAILURES", 2)
+    monkeypatch.setattr(recommender_client, "_replicas", None)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def run():
+        results = []
+        try:
+            for _ in range(6):
+                try:
+                    results.append(
+                        await recommender_client.post_recommendations([{"name": "Lat"}])
+                    )
+                except httpx.HTTPStatusError:
+                    pass
+        finally:
+            await recommender_client.close_client()
+        return results
+
+    results = asyncio.run(run())
+    assert hosts.count("replica-a.test") == 2
+    assert len(results) == 4
@@ -0,0 +1,123 @@
+"""
+Tests for retrying transient upstream failures.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from webapp.config import Config
+from webapp.services.retry import (
+    RetryBudget,
+    backoff_delay,
+    call_with_retry,
+    is_retryable,
+)
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "http://recommender.test/api/annotate")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError("upstream error", request=request, response=response)
+
+
+@pytest.fixture(autouse=True, name="fast_backoff")
+def fast_backoff_fixture(monkeypatch):
+    """
+    Fixture shrinking the backoff so that retries do not slow the tests down.
+    """
+    monkeypatch.setattr(Config, "RECOMMENDER_RETRY_ATTEMPTS", 3)
+    monkeypatch.setattr(Config, "RECOMMENDER_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(Config, "RECOMMENDER_RETRY_MAX_DELAY", 0.002)
+
+
+def _flaky(*errors):
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return call, calls
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (_status_error(503), True),
+        (_status_error(429), True),
+        (_status_error(500), False),
+        (_status_error(400), False),
+        (httpx.ConnectError("refused"), True),
+        (httpx.ReadTimeout("slow"), True),
+        (ValueError("bad JSON"), False),
+    ],
+)
+def test_error_classification(error, expected):
+    """
+    Test which upstream errors are considered transient.
+    """
+    assert is_retryable(error) is expected
+
+
+def test_backoff_is_capped():
+    """
+    Test that the jittered backoff never exceeds the exponential ceiling or the cap.
+    """
+    for retry in range(10):
+        assert 0 <= backoff_delay(retry, 0.1, 1.0) <= min(1.0, 0.1 * 2**retry)
+
+
+def test_transient_errors_are_retried():
+    """
+    Test that a call recovering within the allowed attempts succeeds.
+    """
+    call, calls = _flaky(_status_error(502), httpx.ConnectError("refused"))
+    assert asyncio.run(call_with_retry(call, RetryBudget(5))) == "ok"
+    assert len(calls) == 3
+
+
+def test_attempts_are_limited():
+    """
+    Test that the last error is raised once the attempts are used up.
+    """
+    call, calls = _flaky(*[_status_error(503)] * 5)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retry(call, RetryBudget(5)))
+    assert len(calls) == 3
+
+
+def test_permanent_errors_are_not_retried():
+    """
+    Test that a non-retryable error is raised straight away.
+    """
+    call, calls = _flaky(_status_error(400))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retry(call, RetryBudget(5)))
+    assert len(calls) == 1
+
+
+def test_retry_budget_is_shared():
+    """
+    Test that calls of one request stop retrying once the request's budget is spent.
+    """
+    budget = RetryBudget(1)
+    first, first_calls = _flaky(_status_error(503))
+    second, second_calls = _flaky(_status_error(503))
+    assert asyncio.run(call_with_retry(first, budget)) == "ok"
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retry(second, budget))
+    assert (len(first_calls), len(second_calls)) == (2, 1)
+
+
+def test_retry_is_not_started_past_the_deadline():
+    """
+    Test that no retry is made when the backoff would outlast the request's deadline.
+    """
+    call, calls = _flaky(_status_error(503))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retry(call, RetryBudget(5), remaining=lambda: 0.0))
+    assert len(calls) == 1
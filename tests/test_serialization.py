@@ -0,0 +1,243 @@
+"""
+Tests for the JSON, MessagePack and CBOR encodings of request and response bodies.
+"""
+
+import copy
+import json
+
+import cbor2
+import msgpack
+import pytest
+
+from webapp.models.mock_objects import (
+    MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS,
+    MOCK_SELECTION,
+)
+from webapp.utils import serialization
+from webapp.utils.serialization import (
+    JSONFragment,
+    JSONSlot,
+    JSONTemplate,
+    dumps_json,
+    negotiate_media_type,
+)
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("application/msgpack", "application/msgpack"),
+        ("application/x-msgpack", "application/msgpack"),
+        ("application/json, application/msgpack;q=0.9", None),
+        ("application/msgpack, application/json;q=0.5", "application/msgpack"),
+        ("*/*", None),
+        ("", None),
+    ],
+)
+def test_negotiate_media_type(accept, expected):
+    """
+    Test that a binary encoding is only chosen when the client prefers it over JSON.
+    """
+    assert negotiate_media_type(accept) == expected
+
+
+def test_recommendations_msgpack_round_trip(client, mock_payload):
+    """
+    Test that a MessagePack request answered in MessagePack carries the same results as JSON.
+    """
+    expected = client.post("/api/recommendations", json=mock_payload).json()
+    response = client.post(
+        "/api/recommendations",
+        content=msgpack.packb(mock_payload),
+        headers={
+            "Content-Type": "application/msgpack",
+            "Accept": "application/msgpack",
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    data = msgpack.unpackb(response.content)
+    for results in (data, expected):
+        for item in results:
+            for rec in item["recommendations"]:
+                rec.pop("request_id")
+    assert data == expected
+
+
+def test_recommendations_cbor_round_trip(client, mock_payload):
+    """
+    Test that a CBOR request answered in CBOR carries the same results as JSON.
+    """
+    expected = client.post("/api/recommendations", json=mock_payload).json()
+    response = client.post(
+        "/api/recommendations",
+        content=cbor2.dumps(mock_payload),
+        headers={"Content-Type": "application/cbor", "Accept": "application/cbor"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/cbor"
+    data = cbor2.loads(response.content)
+    for results in (data, expected):
+        for item in results:
+            for rec in item["recommendations"]:
+                rec.pop("request_id")
+    assert data == expected
+
+
+def test_recommendations_default_stays_json(client, mock_payload):
+    """
+    Test that a MessagePack request without a binary Accept header is answered in JSON.
+    """
+    response = client.post(
+        "/api/recommendations",
+        content=msgpack.packb(mock_payload),
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert isinstance(response.json(), list)
+
+
+def test_log_selection_msgpack(client):
+    """
+    Test that selection beacons are validated the same way whether sent as MessagePack or JSON.
+    """
+    headers = {"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+    response = client.post(
+        "/api/log-selection", content=msgpack.packb(MOCK_SELECTION), headers=headers
+    )
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content) == {"status": "received"}
+
+    invalid = copy.deepcopy(MOCK_SELECTION)
+    del invalid["request_id"]
+    response = client.post(
+        "/api/log-selection", content=msgpack.packb(invalid), headers=headers
+    )
+    assert response.status_code == 422
+
+
+def test_malformed_and_unsupported_bodies(client, monkeypatch):
+    """
+    Test that a malformed binary body is rejected with 400 and an unavailable encoding with 415.
+    """
+    response = client.post(
+        "/api/log-selection",
+        content=b"\xc1",
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert response.status_code == 400
+    response = client.post(
+        "/api/log-selection",
+        content=b"\x82\x01",
+        headers={"Content-Type": "application/cbor"},
+    )
+    assert response.status_code == 400
+
+    monkeypatch.setattr(serialization, "cbor2", None)
+    response = client.post(
+        "/api/log-selection",
+        content=b"\xa0",
+        headers={"Content-Type": "application/cbor"},
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_json_matches_standard_library(monkeypatch, use_orjson):
+    """
+    Test that dumps_json writes the same value as the standard library, with and without orjson.
+    """
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    content = [
+        {
+            "label": "lake",
+            "confidence": 0.9,
+            "description": "Sée",
+            "tags": [1, None, True],
+        }
+    ]
+    data = dumps_json(content)
+    assert isinstance(data, bytes)
+    assert json.loads(data) == content
+    assert "Sée".encode("utf-8") in data
+
+
+def test_template_fragments_are_reused():
+    """
+    Test that rendered templates are written from their pre-serialized bytes until changed.
+    """
+    template = JSONTemplate(
+        {
+            "id": JSONSlot("id"),
+            "recommendations": [
+                {"label": "lake", "request_id": JSONSlot("request_id")},
+                {"label": "pond", "request_id": JSONSlot("request_id")},
+            ],
+        }
+    )
+    item = template.render(id="geo-1", request_id='a"b')
+    assert item == {
+        "id": "geo-1",
+        "recommendations": [
+            {"label": "lake", "request_id": 'a"b'},
+            {"label": "pond", "request_id": 'a"b'},
+        ],
+    }
+    assert json.loads(item.serialized) == item
+    assert json.loads(dumps_json([item, {"nested": item}])) == [item, {"nested": item}]
+    item.setdefault("status", "complete")
+    assert json.loads(dumps_json(item))["status"] == "complete"
+
+    # The bytes are spliced in as they are
+    fragment = JSONFragment({"label": "lake"}, b'{"label":"LAKE"}')
+    assert dumps_json({"rec": fragment}) == b'{"rec":{"label":"LAKE"}}'
+    fragment["label"] = "pond"
+    assert fragment.serialized is None
+    assert dumps_json({"rec": fragment}) == b'{"rec":{"label":"pond"}}'
+
+
+@pytest.mark.parametrize("value", ["0", "99", ""])
+def test_client_values_are_not_spliced(value):
+    """
+    Test that strings shaped like a splice placeholder are written as they are.
+    """
+    fragment = JSONFragment({"label": "lake"}, b'{"label":"lake"}')
+    content = [{"id": value}, fragment, {"id": value}]
+    assert json.loads(dumps_json(content)) == content
+
+
+def test_client_ids_next_to_templates(client, mock_payload):
+    """
+    Test that element ids shaped like a splice placeholder come back unchanged next to results
+    rendered from templates.
+    """
+    ids = ["0", "99"]
+    attribute = mock_payload["ATTRIBUTE"][0]
+    payload = {
+        "ATTRIBUTE": [{**attribute, "id": element_id} for element_id in ids],
+        "GEOGRAPHICCOVERAGE": mock_payload["GEOGRAPHICCOVERAGE"],
+    }
+    response = client.post("/api/recommendations", json=payload)
+    assert response.status_code == 200
+    returned = [item["id"] for item in response.json()]
+    assert all(element_id in returned for element_id in ids)
+    assert all(item["id"] in ids for item in response.json()[: len(ids)])
+
+
+def test_geographic_coverage_response_from_templates(client, mock_payload):
+    """
+    Test that geographic coverage results built from templates serialize like the mock data.
+    """
+    response = client.post(
+        "/api/recommendations",
+        json={"GEOGRAPHICCOVERAGE": mock_payload["GEOGRAPHICCOVERAGE"]},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    request_ids = {
+        rec.pop("request_id") for item in data for rec in item["recommendations"]
+    }
+    assert len(request_ids) == 1
+    assert data == json.loads(json.dumps(MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS))
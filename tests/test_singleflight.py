@@ -0,0 +1,83 @@
+"""
+Tests for in-flight deduplication of identical upstream calls.
+"""
+
+import asyncio
+
+import pytest
+
+from webapp.services.singleflight import SingleFlight, payload_key
+
+
+def test_payload_key_ignores_key_order():
+    """
+    Test that payloads differing only in dict key order share a key.
+    """
+    first = [{"name": "Lat", "objectName": "A.csv"}]
+    second = [{"objectName": "A.csv", "name": "Lat"}]
+    assert payload_key(first) == payload_key(second)
+    assert payload_key(first) != payload_key([{"name": "Lon", "objectName": "A.csv"}])
+
+
+def test_concurrent_callers_share_one_call():
+    """
+    Test that concurrent identical calls run once and every caller gets its own copy.
+    """
+    flights = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [{"column_name": "Lat"}]
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", call) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert flights.shared == 2
+    assert len(flights) == 0
+    results[0][0]["request_id"] = "req-1"
+    assert "request_id" not in results[1][0]
+
+
+def test_error_is_raised_to_every_caller():
+    """
+    Test that a failed shared call raises its error to all callers and is not remembered.
+    """
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad response")
+
+    async def run():
+        return await asyncio.gather(
+            flights.do("key", call), flights.do("key", call), return_exceptions=True
+        )
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+    assert len(flights) == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    """
+    Test that a caller giving up leaves the shared call running for the remaining callers.
+    """
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def run():
+        leader = asyncio.ensure_future(flights.do("key", call))
+        follower = asyncio.ensure_future(flights.do("key", call))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "ok"
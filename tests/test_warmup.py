@@ -0,0 +1,122 @@
+"""
+Tests for the startup cache warm-up and the readiness endpoint.
+"""
+
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from webapp import run
+from webapp.config import Config
+from webapp.models.mock_objects import MOCK_FRONTEND_PAYLOAD
+from webapp.services import core, recommender_client, warmup
+
+
+def test_load_payloads_skips_invalid_files(tmp_path):
+    """
+    Test that only JSON object files are loaded, in file name order.
+    """
+    (tmp_path / "b.json").write_text(json.dumps({"ATTRIBUTE": []}))
+    (tmp_path / "a.json").write_text(json.dumps(MOCK_FRONTEND_PAYLOAD))
+    (tmp_path / "broken.json").write_text("{")
+    (tmp_path / "list.json").write_text("[]")
+    (tmp_path / "notes.txt").write_text("ignored")
+    payloads = warmup.load_payloads(str(tmp_path))
+    assert payloads == [MOCK_FRONTEND_PAYLOAD, {"ATTRIBUTE": []}]
+
+
+def test_warm_up_fills_the_cache(monkeypatch, tmp_path):
+    """
+    Test that the warm-up sends the payload attributes upstream with bounded concurrency and
+    caches the results, so a later request makes no upstream call.
+    """
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        calls.append(payload)
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "column_name": item["name"],
+                    "concept_name": item["name"],
+                    "concept_id": "http://purl.dataone.org/odo/ECSO_00002130",
+                    "confidence": 0.9,
+                    "concept_definition": "",
+                }
+                for item in payload
+            ],
+        )
+
+    attributes = MOCK_FRONTEND_PAYLOAD["ATTRIBUTE"]
+    (tmp_path / "survey.json").write_text(json.dumps(MOCK_FRONTEND_PAYLOAD))
+    monkeypatch.setattr(Config, "USE_MOCK_RECOMMENDATIONS", False)
+    monkeypatch.setattr(Config, "API_URLS", ["http://recommender.test/api/annotate"])
+    monkeypatch.setattr(Config, "WARMUP_PAYLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(warmup, "progress", warmup.WarmupProgress())
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(transport=httpx.MockTransport(handler))
+
+    async def run():
+        task = warmup.start_warmup()
+        assert not warmup.progress.finished
+        await task
+        warmed = len(calls)
+        await core.recommend_for_attribute(json.loads(json.dumps(attributes)), "r1")
+        await recommender_client.close_client()
+        return warmed
+
+    warmed = asyncio.run(run())
+    assert warmed > 0
+    assert len(calls) == warmed
+    assert warmup.progress.as_dict() == {
+        "total": 1,
+        "completed": 1,
+        "failed": 0,
+        "finished": True,
+    }
+
+
+def test_ready_endpoint(client, monkeypatch):
+    """
+    Test that readiness waits for startup and the warm-up, while liveness does not.
+    """
+    monkeypatch.setattr(warmup, "_serving", False)
+    monkeypatch.setattr(warmup.progress, "finished", True)
+    assert client.get("/ready").status_code == 503
+    assert client.get("/").status_code == 200
+    warmup.set_serving(True)
+    warmup.progress.finished = False
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["warmup"]["finished"] is False
+    warmup.progress.finished = True
+    assert client.get("/ready").json()["status"] == "ready"
+
+
+def test_startup_probes_model_version_before_warm_up(monkeypatch, tmp_path):
+    """
+    Test that the app learns the model version before the warm-up starts, so warmed entries are
+    stored under the keys requests will look up.
+    """
+    seen = []
+    monkeypatch.setattr(Config, "RECOMMENDER_VERSION_URL", "http://recommender.test/v")
+    monkeypatch.setattr(
+        Config, "RECOMMENDATION_CACHE_DB_PATH", str(tmp_path / "cache.sqlite3")
+    )
+    monkeypatch.setattr(recommender_client, "_model_version", None)
+    monkeypatch.setattr(recommender_client, "_client", None)
+    recommender_client.open_client(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"version": "2024.2"})
+        )
+    )
+    monkeypatch.setattr(
+        run, "start_warmup", lambda: seen.append(recommender_client.model_version())
+    )
+    with TestClient(run.app):
+        pass
+    assert seen == ["2024.2"]
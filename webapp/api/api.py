@@ -2,26 +2,212 @@
 API endpoints for the Semantic EML Annotator Backend.
 """
 
+import asyncio
 import json
+import re
+import secrets
 import uuid
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
 import daiquiri
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Body
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Body,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 
+from webapp.api.negotiation import NegotiatedRoute, negotiated_response
+from webapp.api.responses import FastJSONResponse
+from webapp.config import Config
 from webapp.services.core import (
     ProposalRequest,
+    purge_recommendation_cache,
+    recommendation_cache_stats,
     send_email_notification,
-    recommend_for_attribute,
-    recommend_for_geographic_coverage,
 )
+from webapp.services.registry import (
+    RecommenderEntry,
+    recommenders_for,
+    skipped_results,
+)
+from webapp.services.warmup import is_ready, progress
 from webapp.models.log_selection import LogSelection
+from webapp.utils.serialization import dumps_json
+from webapp.utils.utils import ConceptTable
 
 daiquiri.setup()
 logger = daiquiri.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute, default_response_class=FastJSONResponse)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BUDGET_HEADER = "X-Request-Budget"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def _wants_ndjson(request: Request) -> bool:
+    """
+    Whether the client opted in to the streaming NDJSON response mode, either through the Accept
+    header or the ``stream`` query flag.
+
+    :param request: The incoming request
+    :return: True if the response should be streamed as NDJSON
+    """
+    if request.query_params.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _wants_concept_table(request: Request) -> bool:
+    """
+    Whether the client opted in to the normalized concept-table response shape with
+    ``?shape=table``.
+
+    :param request: The incoming request
+    :return: True if the response should use the normalized shape
+    """
+    return request.query_params.get("shape", "").lower() == "table"
+
+
+def _request_deadline(request: Request) -> Optional[float]:
+    """
+    Converts the optional latency budget header (seconds, e.g. ``X-Request-Budget: 3``) into an
+    absolute event loop deadline.
+
+    :param request: The incoming request
+    :return: Event loop time by which to respond, or None if no budget was given
+    :raises HTTPException: If the header is not a positive number of seconds
+    """
+    budget = request.headers.get(BUDGET_HEADER)
+    if budget is None:
+        return None
+    try:
+        seconds = float(budget.strip().removesuffix("s"))
+    except ValueError:
+        seconds = -1.0
+    if not seconds > 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{BUDGET_HEADER} must be a positive number of seconds.",
+        )
+    seconds = min(seconds, Config.RECOMMENDATION_REQUEST_TIMEOUT)
+    return asyncio.get_running_loop().time() + seconds
+
+
+async def _iter_result_parts(  # pylint: disable=too-many-locals
+    entries: List[RecommenderEntry],
+    payload: Dict[str, Any],
+    request_id: str,
+    deadline: Optional[float] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Runs the recommenders of all entries at the same time and yields parts of their merged
+    results in completion order.
+
+    :param entries: Recommender entries to dispatch
+    :param payload: The request payload containing EML metadata elements
+    :param request_id: The request UUID to include in each recommendation object
+    :param deadline: Event loop time by which the request wants its results, if any
+    :param timeout: Seconds after which the recommenders still running are given up (None for
+        no limit); their elements not yielded by then are yielded with ``"status": "skipped"``
+    :return: Async iterator over parts of the merged recommendation results
+    """
+    parts: asyncio.Queue = asyncio.Queue()
+
+    async def pump(entry: RecommenderEntry) -> None:
+        try:
+            async for part in entry.iter_results(
+                payload[entry.eml_type], request_id, deadline
+            ):
+                await parts.put((entry, part))
+            await parts.put((entry, None))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            await parts.put((entry, e))
+
+    loop = asyncio.get_running_loop()
+    timeout_at = None if timeout is None else loop.time() + timeout
+    tasks = [asyncio.ensure_future(pump(entry)) for entry in entries]
+    # Ids of the results yielded so far, for each entry still running
+    running: Dict[str, Set[Any]] = {entry.eml_type: set() for entry in entries}
+    try:
+        while running:
+            wait = None if timeout_at is None else timeout_at - loop.time()
+            try:
+                entry, part = await asyncio.wait_for(parts.get(), timeout=wait)
+            except asyncio.TimeoutError:
+                logger.error(
+                    "Recommendation request %s exceeded the %s s deadline.",
+                    request_id,
+                    timeout,
+                )
+                for eml_type, done in running.items():
+                    yield skipped_results(payload[eml_type], done)
+                return
+            if part is None:
+                del running[entry.eml_type]
+            elif isinstance(part, Exception):
+                raise part
+            else:
+                running[entry.eml_type].update(item.get("id") for item in part)
+                yield part
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _stream_recommendations(
+    payload: Dict[str, Any], request_id: str, deadline: Optional[float] = None
+) -> AsyncIterator[bytes]:
+    """
+    Yields each merged recommendation result as a line of NDJSON as soon as its file group
+    completes. Results still missing after Config.RECOMMENDATION_REQUEST_TIMEOUT are streamed as
+    skipped.
+
+    :param payload: The request payload containing EML metadata elements
+    :param request_id: The request UUID to include in each recommendation object
+    :param deadline: Event loop time by which the request wants its results, if any
+    :return: Async iterator over NDJSON lines
+    """
+    count = 0
+    try:
+        async for part in _iter_result_parts(
+            recommenders_for(payload),
+            payload,
+            request_id,
+            deadline,
+            Config.RECOMMENDATION_REQUEST_TIMEOUT,
+        ):
+            for item in part:
+                count += 1
+                yield dumps_json(item) + b"\n"
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # The status line has already been sent, so the stream can only be cut short
+        logger.exception("Error streaming /api/recommendations: %s", e)
+        return
+    logger.info("Streamed %d recommendation results.", count)
+
+
+def _require_admin(request: Request) -> None:
+    """
+    Dependency guarding the admin endpoints with the shared Config.ADMIN_TOKEN.
+
+    :param request: The incoming request
+    :return: None
+    :raises HTTPException: 403 if no admin token is configured, 401 if the request's token does
+        not match
+    """
+    if not Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled.")
+    token = request.headers.get(ADMIN_TOKEN_HEADER, "")
+    if not secrets.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
 
 
 @router.get("/")
@@ -35,6 +221,24 @@ def read_root() -> Dict[str, str]:
     return {"message": "Semantic EML Annotator Backend is running."}
 
 
+@router.get("/ready")
+def read_ready() -> FastJSONResponse:
+    """
+    Readiness check: 200 once the backend has started and finished warming up its cache, 503
+    before that and while shutting down. Liveness is reported by the health check.
+
+    :return: FastJSONResponse with the readiness status and the warm-up progress
+    """
+    ready = is_ready()
+    return FastJSONResponse(
+        content={
+            "status": "ready" if ready else "not ready",
+            "warmup": progress.as_dict(),
+        },
+        status_code=200 if ready else 503,
+    )
+
+
 @router.post("/api/proposals")
 async def submit_proposal(
     proposal: ProposalRequest, background_tasks: BackgroundTasks
@@ -59,38 +263,82 @@ async def submit_proposal(
 
 
 @router.post("/api/recommendations")
-def recommend_annotations(payload: Dict[str, Any] = Body(...)) -> JSONResponse:
+async def recommend_annotations(
+    request: Request, payload: Dict[str, Any] = Body(...)
+) -> Response:
     """
     Accepts a JSON payload of EML metadata elements grouped by type (e.g. ATTRIBUTE,
-    GEOGRAPHICCOVERAGE), parses the types, fans out to respective recommendation engines, and
-    combines the results. Implements a gateway aggregation pattern for annotation recommendations.
-    If no recognized types are present, returns the original mock response for backward
-    compatibility.
+    GEOGRAPHICCOVERAGE), looks up the recommender registered for each type, fans out to all of
+    them concurrently, and combines the results in registration order. Implements a gateway
+    aggregation pattern for annotation recommendations. If no recognized types are present,
+    returns an empty list.
+    The whole aggregation is bounded by Config.RECOMMENDATION_REQUEST_TIMEOUT.
+
+    Clients sending ``Accept: application/x-ndjson`` (or ``?stream=true``) instead receive each
+    merged ``{id, recommendations}`` result as a line of NDJSON as soon as its file group completes.
+    When the deadline passes, the results still missing are streamed with ``"status": "skipped"``.
+
+    Clients may send a latency budget in seconds (``X-Request-Budget: 3``). The recommenders then
+    return whatever is ready when the budget runs out, and every result carries a ``status`` of
+    ``complete``, ``pending`` (still being computed; ask again later) or ``skipped``.
 
+    Results served from expired cache entries while they are being refreshed carry
+    ``"stale": true``.
+
+    Clients sending ``?shape=table`` receive the normalized shape instead: every distinct concept
+    and annotation property is listed once in the top-level ``concepts`` and ``properties``
+    tables, and each result carries its ``attributeName`` and ``objectName`` and a list of
+    ``{"concept", "property", "confidence"}`` index records. The request_id is given once at the
+    top level. Streaming responses always use the default shape.
+
+    Batch clients may send the payload as MessagePack or CBOR (``Content-Type:
+    application/msgpack`` or ``application/cbor``) and ask for either in the Accept header; the
+    schema is the same as with JSON, which stays the default.
+
+    :param request: The incoming request, used for response mode negotiation
     :param payload: The request payload containing EML metadata elements
-    :return: JSONResponse with the recommendations or an empty list
-    :raises HTTPException: If an error occurs during processing
+    :return: FastJSONResponse (or MessagePack/CBOR response) with the recommendations or an empty
+        list, or a StreamingResponse
+    :raises HTTPException: If an error occurs during processing, or 504 if the request deadline
+        is exceeded
     """
     logger.info("Received recommendation payload: %s", json.dumps(payload, indent=2))
-    results = []
     request_id = str(uuid.uuid4())
+    deadline = _request_deadline(request)
+    if _wants_ndjson(request):
+        return StreamingResponse(
+            _stream_recommendations(payload, request_id, deadline),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    table = ConceptTable() if _wants_concept_table(request) else None
+    recommenders = [
+        entry.run(payload[entry.eml_type], request_id, deadline, table)
+        for entry in recommenders_for(payload)
+    ]
     try:
-        if "ATTRIBUTE" in payload:
-            recommended_attributes = recommend_for_attribute(
-                payload["ATTRIBUTE"], request_id=request_id
-            )
-            results.append(recommended_attributes)
-        if "GEOGRAPHICCOVERAGE" in payload:
-            recommended_geographic_coverage = recommend_for_geographic_coverage(
-                payload["GEOGRAPHICCOVERAGE"], request_id=request_id
-            )
-            results.append(recommended_geographic_coverage)
+        # gather keeps the order of the recommenders, whichever finishes first
+        results = await asyncio.wait_for(
+            asyncio.gather(*recommenders), timeout=Config.RECOMMENDATION_REQUEST_TIMEOUT
+        )
+        flat_results = [item for sublist in results for item in sublist]
         if results:
-            flat_results = [item for sublist in results for item in sublist]
             logger.info("Returning %d recommendation results.", len(flat_results))
-            return JSONResponse(content=flat_results, status_code=200)
-        logger.warning("No recognized types in payload. Returning empty list.")
-        return JSONResponse(content=[], status_code=200)
+        else:
+            logger.warning("No recognized types in payload. Returning empty list.")
+        if table is not None:
+            return negotiated_response(
+                request, table.response(flat_results, request_id)
+            )
+        return negotiated_response(request, flat_results)
+    except asyncio.TimeoutError as e:
+        logger.error(
+            "Recommendation request %s exceeded the %s s deadline.",
+            request_id,
+            Config.RECOMMENDATION_REQUEST_TIMEOUT,
+        )
+        raise HTTPException(
+            status_code=504, detail="Timed out waiting for recommendations."
+        ) from e
     except Exception as e:
         logger.exception("Error in /api/recommendations: %s", e)
         raise HTTPException(
@@ -98,18 +346,57 @@ def recommend_annotations(payload: Dict[str, Any] = Body(...)) -> JSONResponse:
         ) from e
 
 
+@router.get("/api/admin/cache", dependencies=[Depends(_require_admin)])
+async def get_cache_stats() -> Dict[str, Any]:
+    """
+    Reports hit/miss/eviction counters, entry counts and sizes of each recommendation cache tier.
+
+    :return: Statistics of the memory, persistent and negative caches
+    """
+    return await recommendation_cache_stats()
+
+
+@router.delete("/api/admin/cache", dependencies=[Depends(_require_admin)])
+async def purge_cache(
+    objectName: Optional[str] = None,  # pylint: disable=invalid-name
+    prefix: Optional[str] = None,
+    purge_all: bool = Query(False, alias="all"),
+) -> Dict[str, Any]:
+    """
+    Purges cached recommendations of a dataset file (``?objectName=``), with a content hash
+    prefix (``?prefix=``), or all of them (``?all=true``).
+
+    :param objectName: objectName of the file whose entries are removed
+    :param prefix: Hex content hash prefix of the entries to remove
+    :param purge_all: Must be set to purge everything, so an empty query cannot do it by mistake
+    :return: Number of entries removed per tier
+    :raises HTTPException: 400 if no filter is given or the prefix is not hexadecimal
+    """
+    if prefix is not None and not re.fullmatch(r"[0-9a-f]+", prefix):
+        raise HTTPException(
+            status_code=400, detail="prefix must be lowercase hexadecimal."
+        )
+    if objectName is None and prefix is None and not purge_all:
+        raise HTTPException(
+            status_code=400, detail="Give objectName, prefix or all=true."
+        )
+    return {"purged": await purge_recommendation_cache(objectName, prefix)}
+
+
 @router.post("/api/log-selection")
-async def log_selection(payload: LogSelection):
+async def log_selection(request: Request, payload: LogSelection) -> Response:
     """
     Receives a log-selection POST payload, prints it for debugging, and returns a status response.
+    Like /api/recommendations, it also accepts and answers MessagePack and CBOR.
 
+    :param request: The incoming request, used for response encoding negotiation
     :param payload: The validated log-selection payload
     :return: Status message indicating receipt
     """
     print("\n--- 🐍 Incoming Python Beacon ---")
     print(json.dumps(payload.model_dump(), indent=2))
     print("---------------------------------\n")
-    return {"status": "received"}
+    return negotiated_response(request, {"status": "received"})
 
 
 __all__ = ["router"]
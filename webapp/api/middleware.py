@@ -0,0 +1,115 @@
+"""
+ASGI middleware for the Semantic EML Annotator Backend.
+"""
+
+import asyncio
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from webapp.config import Config
+from webapp.utils.compression import GZIP, StreamCompressor, negotiate_encoding
+
+# Bodies at least this large are compressed in a worker thread to keep the event loop free
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+class CompressionMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Compresses responses with the best content coding the client accepts (Brotli or gzip).
+
+    Bodies smaller than the minimum size are sent as they are, as are responses that already
+    have a Content-Encoding. Streamed responses (e.g. NDJSON) are compressed part by part and
+    flushed, so every line still reaches the client as soon as it is produced.
+
+    :param app: The wrapped ASGI application
+    :param minimum_size: Minimum body size in bytes worth compressing
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = (
+            Config.RESPONSE_COMPRESSION_MINIMUM_SIZE
+            if minimum_size is None
+            else minimum_size
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:  # pylint: disable=too-few-public-methods
+    """
+    Send wrapper compressing the body of one response.
+    """
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._compressor: Optional[StreamCompressor] = None
+        self._passthrough = False
+
+    async def _compress(self, body: bytes, final: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await asyncio.to_thread(self._compressor.compress, body, final)
+        return self._compressor.compress(body, final)
+
+    async def send(self, message: Message) -> None:
+        """
+        Handle one ASGI message of the response.
+
+        :param message: ASGI send message
+        :return: None
+        """
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self._passthrough = (
+                "content-encoding" in headers or message["status"] == 206
+            )
+            if self._passthrough:
+                await self._send(message)
+            else:
+                # Held back until the first body part shows whether to compress
+                self._start = message
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._start is not None:
+            start, self._start = self._start, None
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                self._passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+            level = (
+                Config.RESPONSE_GZIP_LEVEL
+                if self.encoding == GZIP
+                else Config.RESPONSE_BROTLI_QUALITY
+            )
+            self._compressor = StreamCompressor(self.encoding, level)
+            headers["Content-Encoding"] = self.encoding
+            body = await self._compress(body, final=not more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+            await self._send(start)
+        else:
+            body = await self._compress(body, final=not more_body)
+        await self._send({**message, "body": body})
@@ -0,0 +1,97 @@
+"""
+Content negotiation between JSON and the binary encodings (MessagePack, CBOR) of the API.
+
+Request bodies sent as ``application/msgpack`` or ``application/cbor`` are decoded straight into
+the structure FastAPI validates, so endpoints and their models are shared with JSON. Responses
+are encoded in the binary type the client's Accept header prefers over JSON, if any.
+"""
+
+from typing import Any, Callable, Coroutine
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from webapp.api.responses import FastJSONResponse
+from webapp.utils.serialization import (
+    JSON_MEDIA_TYPE,
+    binary_media_type,
+    decode,
+    encode,
+    negotiate_media_type,
+    supported_media_types,
+)
+
+
+class _DecodedRequest(Request):
+    """
+    Request with a binary body, presented to FastAPI as the equivalent JSON request.
+
+    :param request: The original request
+    :param media_type: Binary media type of the body
+    """
+
+    def __init__(self, request: Request, media_type: str):
+        headers = [
+            (name, value)
+            for name, value in request.scope["headers"]
+            if name != b"content-type"
+        ]
+        headers.append((b"content-type", JSON_MEDIA_TYPE.encode("latin-1")))
+        super().__init__({**request.scope, "headers": headers}, request.receive)
+        self.body_media_type = media_type
+
+    async def json(self) -> Any:
+        # FastAPI answers errors raised here (e.g. a malformed body) with 400
+        if not hasattr(self, "_json"):
+            self._json = decode(  # pylint: disable=attribute-defined-outside-init
+                await self.body(), self.body_media_type
+            )
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route accepting MessagePack and CBOR request bodies in addition to JSON.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            media_type = binary_media_type(request.headers.get("content-type", ""))
+            if media_type is not None:
+                if media_type not in supported_media_types():
+                    raise HTTPException(
+                        status_code=415,
+                        detail=f"{media_type} request bodies are not supported.",
+                    )
+                request = _DecodedRequest(request, media_type)
+            return await handler(request)
+
+        return route_handler
+
+
+def negotiated_response(
+    request: Request, content: Any, status_code: int = 200
+) -> Response:
+    """
+    Response with the content in the encoding the client prefers.
+
+    :param request: The incoming request, whose Accept header selects the encoding
+    :param content: JSON-compatible response content
+    :param status_code: HTTP status code
+    :return: A MessagePack or CBOR response if the client prefers one, otherwise a
+        FastJSONResponse
+    """
+    media_type = negotiate_media_type(request.headers.get("accept", ""))
+    headers = {"Vary": "Accept"}
+    if media_type is None:
+        return FastJSONResponse(
+            content=content, status_code=status_code, headers=headers
+        )
+    return Response(
+        content=encode(content, media_type),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -0,0 +1,19 @@
+"""
+Response classes for the Semantic EML Annotator Backend.
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from webapp.utils.serialization import dumps_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by dumps_json: with orjson when it is installed, straight to bytes,
+    and reusing the serialization of pre-serialized fragments (e.g. from a JSONTemplate).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
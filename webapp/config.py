@@ -0,0 +1,198 @@
+"""
+Configuration for the annotation engine and email notifications.
+"""
+
+
+# pylint: disable=too-few-public-methods
+class Config:
+    """
+    Centralized configuration for the annotation engine and email notifications.
+
+    :cvar VOCABULARY_PROPOSAL_RECIPIENT: Email address for proposal notifications
+    :cvar SMTP_SERVER: SMTP server address
+    :cvar SMTP_PORT: SMTP server port
+    :cvar SMTP_USER: SMTP username
+    :cvar SMTP_PASSWORD: SMTP password
+    :cvar ADMIN_TOKEN: Shared secret for the admin endpoints, sent as X-Admin-Token (empty
+        disables them)
+    :cvar USE_MOCK_RECOMMENDATIONS: Whether to use mock recommendations
+    :cvar MERGE_CONFIG: Configuration for merging recommender results
+    :cvar API_URLS: Annotate endpoint URLs of the attribute recommender replicas
+    :cvar RECOMMENDER_EWMA_ALPHA: Weight of the newest sample in a replica's latency average
+    :cvar RECOMMENDER_EJECTION_FAILURES: Consecutive failures after which a replica is ejected
+    :cvar RECOMMENDER_EJECTION_TIME: Seconds an ejected replica is avoided
+    :cvar RECOMMENDER_MODEL_VERSION_HEADER: Upstream response header carrying the model version,
+        which becomes part of every cache key
+    :cvar RECOMMENDER_VERSION_URL: URL of a cheap upstream version probe (empty disables)
+    :cvar RECOMMENDER_VERSION_FIELD: JSON field holding the version in the probe response
+    :cvar RECOMMENDER_VERSION_PROBE_INTERVAL: Seconds between version probes
+    :cvar RECOMMENDER_PAYLOAD_FORMAT: Upstream payload format: 'records' (attribute records
+        trimmed to name, description, entityDescription and objectName; context and ids are
+        not sent), 'recommender' (recommender field names) or 'compact' (entity text once per
+        file)
+    :cvar RECOMMENDER_REQUEST_COMPRESSION: Content coding of upstream request bodies, 'gzip' or
+        'br' (empty sends them uncompressed; the recommender must accept it)
+    :cvar RECOMMENDER_REQUEST_COMPRESSION_MINIMUM_SIZE: Minimum upstream body size in bytes that
+        is compressed
+    :cvar RECOMMENDER_REQUEST_COMPRESSION_LEVEL: gzip level or Brotli quality of upstream bodies
+    :cvar RESPONSE_COMPRESSION_MINIMUM_SIZE: Minimum response body size in bytes that is
+        compressed for clients accepting gzip or Brotli
+    :cvar RESPONSE_GZIP_LEVEL: gzip compression level (1-9) of responses
+    :cvar RESPONSE_BROTLI_QUALITY: Brotli quality (0-11) of responses
+    :cvar RECOMMENDER_POOL_SIZE: Maximum number of pooled connections to the recommender
+    :cvar RECOMMENDER_KEEPALIVE_EXPIRY: Seconds an idle pooled connection is kept alive
+    :cvar RECOMMENDER_TIMEOUT: Read/write timeout in seconds for recommender calls
+    :cvar RECOMMENDER_CONNECT_TIMEOUT: Connect timeout in seconds for recommender calls
+    :cvar RECOMMENDER_POOL_TIMEOUT: Seconds to wait for a free pooled connection
+    :cvar RECOMMENDER_MAX_CONCURRENCY: Maximum concurrent upstream calls per request
+    :cvar RECOMMENDER_MAX_CHUNK_ATTRIBUTES: Maximum attributes per upstream call for one file
+    :cvar RECOMMENDER_MAX_CHUNK_BYTES: Maximum approximate payload bytes per upstream call
+    :cvar RECOMMENDER_RETRY_ATTEMPTS: Maximum attempts of one upstream call (1 disables retries)
+    :cvar RECOMMENDER_RETRY_BASE_DELAY: Backoff ceiling in seconds before the first retry
+    :cvar RECOMMENDER_RETRY_MAX_DELAY: Maximum backoff ceiling in seconds
+    :cvar RECOMMENDER_RETRY_BUDGET: Maximum retries across all upstream calls of one request
+    :cvar RECOMMENDER_RETRY_STATUSES: Upstream HTTP statuses that are retried
+    :cvar RECOMMENDATION_REQUEST_TIMEOUT: Overall deadline in seconds for /api/recommendations
+    :cvar RECOMMENDER_SETTINGS: Per EML type recommender settings (merge_config overrides,
+        max_concurrency, timeout, cache)
+    :cvar RECOMMENDER_BATCH_WINDOW: Seconds to collect file groups from concurrent requests into
+        one upstream call (0 disables batching)
+    :cvar RECOMMENDER_MAX_BATCH_SIZE: Maximum number of attributes in one batched upstream call
+    :cvar CIRCUIT_BREAKER_FAILURE_RATE: Fraction of failed or slow upstream calls that opens the
+        circuit
+    :cvar CIRCUIT_BREAKER_MIN_CALLS: Minimum calls in the window before the circuit can open
+    :cvar CIRCUIT_BREAKER_WINDOW: Number of most recent upstream calls tracked
+    :cvar CIRCUIT_BREAKER_SLOW_CALL: Seconds after which an upstream call counts as failed
+    :cvar CIRCUIT_BREAKER_RESET_TIMEOUT: Seconds the circuit stays open before a probe call
+    :cvar RECOMMENDER_HEDGING: Whether slow upstream calls are hedged with a duplicate request
+    :cvar RECOMMENDER_HEDGE_PERCENTILE: Latency percentile after which a call is hedged
+    :cvar RECOMMENDER_HEDGE_MIN_DELAY: Minimum seconds to wait before hedging
+    :cvar RECOMMENDER_HEDGE_MAX_RATIO: Maximum extra upstream calls per call added by hedging
+    :cvar RECOMMENDER_HEDGE_WINDOW: Number of recent upstream latencies tracked
+    :cvar RECOMMENDER_HEDGE_MIN_SAMPLES: Latency samples needed before hedging starts
+    :cvar RECOMMENDATION_CACHE_MAX_ENTRIES: Maximum number of cached attributes (0 disables)
+    :cvar RECOMMENDATION_CACHE_MAX_BYTES: Maximum approximate size of the cached recommendations
+    :cvar RECOMMENDATION_CACHE_TTL: Seconds a cached recommendation stays fresh
+    :cvar RECOMMENDATION_CACHE_GRACE: Seconds an expired recommendation is still served, flagged
+        stale, while it is refreshed in the background (0 disables)
+    :cvar RECOMMENDATION_NEGATIVE_CACHE_CAPACITY: Attributes without recommendations remembered
+        per Bloom filter generation (0 disables)
+    :cvar RECOMMENDATION_NEGATIVE_CACHE_ERROR_RATE: False positive rate of a full generation
+    :cvar RECOMMENDATION_NEGATIVE_CACHE_TTL: Seconds a generation accepts new attributes; they are
+        remembered for one to two TTLs
+    :cvar WARMUP_PAYLOAD_DIR: Directory of EML payload JSON files used to warm up the cache at
+        startup (empty disables)
+    :cvar WARMUP_CONCURRENCY: Maximum number of warm-up payloads processed at the same time
+    :cvar RECOMMENDATION_CACHE_DB_PATH: SQLite file of the persistent cache tier (None disables)
+    :cvar RECOMMENDATION_CACHE_DB_TTL: Seconds a persisted recommendation stays fresh
+    :cvar RECOMMENDATION_CACHE_DB_FLUSH_INTERVAL: Seconds between batched writes to SQLite
+    :cvar RECOMMENDATION_CACHE_DB_BATCH_SIZE: Maximum rows per batched write to SQLite
+    """
+
+    VOCABULARY_PROPOSAL_RECIPIENT = "curator@mail.com"
+    SMTP_SERVER = "smtp.mail.com"
+    SMTP_PORT = 587
+    SMTP_USER = "curator@mail.com"
+    SMTP_PASSWORD = "xxxx xxxx xxxx xxxx"
+    ADMIN_TOKEN = ""
+
+    # Centralized configuration for annotation engine
+    USE_MOCK_RECOMMENDATIONS: bool = (
+        True  # Set to False to use real recommendation logic
+    )
+    MERGE_CONFIG: dict = {
+        "ATTRIBUTE": {
+            "property_label": "contains measurements of type",
+            "property_uri": "http://ecoinformatics.org/oboe/oboe.1.2/oboe-core.owl#"
+            "containsMeasurementsOfType",
+            "join_key": "column_name",
+        },
+        "GEOGRAPHICCOVERAGE": {
+            "property_label": "broad-scale environmental context",
+            "property_uri": "https://genomicsstandardsconsortium.github.io/mixs/0000012/",
+        },
+    }
+
+    # API endpoint configuration of the attribute recommender (private, for internal use only)
+    _BASE_URL: str = "http://xx.xx.xx.xx:xxxx"
+    _ANNOTATE_ENDPOINT: str = "/api/xxx"
+    API_URLS: list = [f"{_BASE_URL}{_ANNOTATE_ENDPOINT}"]
+    RECOMMENDER_PAYLOAD_FORMAT: str = "records"
+    RECOMMENDER_REQUEST_COMPRESSION: str = ""
+    RECOMMENDER_REQUEST_COMPRESSION_MINIMUM_SIZE: int = 4096
+    RECOMMENDER_REQUEST_COMPRESSION_LEVEL: int = 5
+
+    # Compression of responses to clients
+    RESPONSE_COMPRESSION_MINIMUM_SIZE: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4
+
+    # Load balancing across recommender replicas
+    RECOMMENDER_EWMA_ALPHA: float = 0.3
+    RECOMMENDER_EJECTION_FAILURES: int = 3
+    RECOMMENDER_EJECTION_TIME: float = 30.0
+
+    # Recommender model version, part of every cache key
+    RECOMMENDER_MODEL_VERSION_HEADER: str = "X-Model-Version"
+    RECOMMENDER_VERSION_URL: str = ""
+    RECOMMENDER_VERSION_FIELD: str = "version"
+    RECOMMENDER_VERSION_PROBE_INTERVAL: float = 300.0
+
+    # Pooled HTTP client for the attribute recommender
+    RECOMMENDER_POOL_SIZE: int = 20
+    RECOMMENDER_KEEPALIVE_EXPIRY: float = 30.0
+    RECOMMENDER_TIMEOUT: float = 60.0
+    RECOMMENDER_CONNECT_TIMEOUT: float = 5.0
+    RECOMMENDER_POOL_TIMEOUT: float = 10.0
+    RECOMMENDER_MAX_CONCURRENCY: int = 8
+    RECOMMENDER_MAX_CHUNK_ATTRIBUTES: int = 50
+    RECOMMENDER_MAX_CHUNK_BYTES: int = 256 * 1024
+    RECOMMENDER_RETRY_ATTEMPTS: int = 3
+    RECOMMENDER_RETRY_BASE_DELAY: float = 0.2
+    RECOMMENDER_RETRY_MAX_DELAY: float = 2.0
+    RECOMMENDER_RETRY_BUDGET: int = 10
+    RECOMMENDER_RETRY_STATUSES: tuple = (429, 502, 503, 504)
+    RECOMMENDATION_REQUEST_TIMEOUT: float = 120.0
+    RECOMMENDER_SETTINGS: dict = {
+        "ATTRIBUTE": {"timeout": 90.0, "cache": True},
+        "GEOGRAPHICCOVERAGE": {"max_concurrency": 1, "timeout": 10.0},
+        "DATATABLE": {"max_concurrency": 1, "timeout": 10.0},
+    }
+
+    # Cross-request micro-batching of upstream recommender calls
+    RECOMMENDER_BATCH_WINDOW: float = 0.0
+    RECOMMENDER_MAX_BATCH_SIZE: int = 500
+
+    # Circuit breaker around the upstream recommender
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_MIN_CALLS: int = 5
+    CIRCUIT_BREAKER_WINDOW: int = 20
+    CIRCUIT_BREAKER_SLOW_CALL: float = 30.0
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30.0
+
+    # Hedged upstream requests
+    RECOMMENDER_HEDGING: bool = False
+    RECOMMENDER_HEDGE_PERCENTILE: float = 95.0
+    RECOMMENDER_HEDGE_MIN_DELAY: float = 0.05
+    RECOMMENDER_HEDGE_MAX_RATIO: float = 0.1
+    RECOMMENDER_HEDGE_WINDOW: int = 200
+    RECOMMENDER_HEDGE_MIN_SAMPLES: int = 20
+
+    # In-memory recommendation cache (LRU with per-entry TTL)
+    RECOMMENDATION_CACHE_MAX_ENTRIES: int = 50000
+    RECOMMENDATION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RECOMMENDATION_CACHE_TTL: float = 24 * 60 * 60
+    RECOMMENDATION_CACHE_GRACE: float = 7 * 24 * 60 * 60
+    RECOMMENDATION_NEGATIVE_CACHE_CAPACITY: int = 1000000
+    RECOMMENDATION_NEGATIVE_CACHE_ERROR_RATE: float = 0.001
+    RECOMMENDATION_NEGATIVE_CACHE_TTL: float = 6 * 60 * 60
+
+    # Startup cache warm-up
+    WARMUP_PAYLOAD_DIR: str = ""
+    WARMUP_CONCURRENCY: int = 2
+
+    # Persistent recommendation cache shared by all workers and kept across restarts
+    RECOMMENDATION_CACHE_DB_PATH: str = "recommendation_cache.sqlite3"
+    RECOMMENDATION_CACHE_DB_TTL: float = 7 * 24 * 60 * 60
+    RECOMMENDATION_CACHE_DB_FLUSH_INTERVAL: float = 1.0
+    RECOMMENDATION_CACHE_DB_BATCH_SIZE: int = 500
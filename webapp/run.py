@@ -2,22 +2,69 @@
 Entrypoint for the Semantic EML Annotator Backend.
 
 - Instantiates the FastAPI app
-- Adds CORS middleware
+- Opens and closes the pooled recommender HTTP client and the persistent recommendation cache
+  over the app lifespan, probes the recommender model version before warming up the cache in
+  the background, and keeps probing it periodically
+- Adds CORS and response compression middleware
 - Includes the API router
 - Runs the app with Uvicorn if executed as main
 """
 
+import asyncio
+import contextlib
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from webapp.api.api import router
+from webapp.api.middleware import CompressionMiddleware
+from webapp.config import Config
+from webapp.services.recommender_client import (
+    open_client,
+    close_client,
+    probe_model_version,
+    probe_model_version_periodically,
+)
 from webapp.services.core import (
+    open_recommendation_cache,
+    close_recommendation_cache,
     recommend_for_attribute,
     recommend_for_geographic_coverage,
     send_email_notification,
 )
+from webapp.services.warmup import set_serving, start_warmup
 from webapp.models.proposal_request import ProposalRequest, TermDetails, SubmitterInfo
 
-app: FastAPI = FastAPI(title="Semantic EML Annotator Backend")
+
+@contextlib.asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """
+    Owns the recommender HTTP client and the persistent recommendation cache for the lifetime of
+    the application.
+
+    :param _app: The FastAPI application
+    """
+    open_client()
+    open_recommendation_cache()
+    background = []
+    if Config.RECOMMENDER_VERSION_URL:
+        # The warm-up and first requests must build their cache keys with the current version
+        await probe_model_version()
+        background.append(asyncio.create_task(probe_model_version_periodically()))
+    background.append(start_warmup())
+    set_serving(True)
+    yield
+    set_serving(False)
+    for task in background:
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    await close_client()
+    close_recommendation_cache()
+
+
+app: FastAPI = FastAPI(title="Semantic EML Annotator Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +74,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(router)
 
 __all__ = [
@@ -0,0 +1,135 @@
+"""
+Cross-request micro-batching of upstream attribute recommender calls.
+
+File groups submitted by concurrent requests are collected for a short window (or until the batch
+is full), sent upstream as a single payload, and the normalized response is split back to each
+caller by column name.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import daiquiri
+
+from webapp.config import Config
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+
+# pylint: disable=too-few-public-methods
+class _PendingGroup:
+    """
+    A file group waiting in the current batch.
+    """
+
+    def __init__(
+        self, payload: List[Dict[str, Any]], columns: Set[str], future: asyncio.Future
+    ):
+        self.payload = payload
+        self.columns = columns
+        self.future = future
+
+
+class RecommenderBatcher:
+    """
+    Collects upstream payloads from concurrent callers and sends them as one upstream call.
+
+    Groups whose column names collide with a group already in the batch start a new batch, so the
+    merged response can always be split back unambiguously by column name.
+
+    :param send: Coroutine function posting a payload upstream and returning the raw response
+    :param normalize: Function normalizing a raw response to a flat list of recommendations
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        normalize: Callable[[Any], List[Dict[str, Any]]],
+    ):
+        self._send = send
+        self._normalize = normalize
+        self._pending: List[_PendingGroup] = []
+        self._columns: Set[str] = set()
+        self._size = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(
+        self, payload: List[Dict[str, Any]], columns: Set[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Queue a file group payload and wait for its share of the batched upstream response.
+
+        :param payload: Upstream payload records for a single file group
+        :param columns: Column names the recommendations of this group are joined on
+        :return: Normalized recommendations belonging to this group
+        :raises httpx.HTTPError: If the batched upstream call fails
+        :raises ValueError: If the batched upstream response is not valid JSON
+        """
+        window = Config.RECOMMENDER_BATCH_WINDOW
+        if window <= 0:
+            return self._normalize(await self._send(payload))
+        max_size = Config.RECOMMENDER_MAX_BATCH_SIZE
+        if self._pending and (
+            self._columns & columns or self._size + len(payload) > max_size
+        ):
+            self._flush()
+        loop = asyncio.get_running_loop()
+        group = _PendingGroup(payload, columns, loop.create_future())
+        self._pending.append(group)
+        self._columns |= columns
+        self._size += len(payload)
+        if self._size >= max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(window, self._flush)
+        return await group.future
+
+    def _flush(self) -> None:
+        """
+        Dispatch the current batch upstream and start a new one.
+
+        :return: None
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending
+        self._pending = []
+        self._columns = set()
+        self._size = 0
+        if batch:
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[_PendingGroup]) -> None:
+        """
+        Send a batch as one upstream call and resolve each caller's future with its share.
+
+        :param batch: The file groups making up the batch
+        :return: None
+        """
+        payload = [record for group in batch for record in group.payload]
+        logger.info(
+            "Sending batch of %d file groups (%d records) upstream.",
+            len(batch),
+            len(payload),
+        )
+        try:
+            recommendations = self._normalize(await self._send(payload))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            for group in batch:
+                if not group.future.done():
+                    group.future.set_exception(e)
+            return
+        shares: Dict[int, List[Dict[str, Any]]] = {id(group): [] for group in batch}
+        for rec in recommendations:
+            for group in batch:
+                if rec.get("column_name") in group.columns:
+                    shares[id(group)].append(rec)
+                    break
+        for group in batch:
+            if not group.future.done():
+                group.future.set_result(shares[id(group)])
@@ -0,0 +1,835 @@
+"""
+Content-addressed caching of normalized attribute recommender results.
+
+Entries are keyed by a stable hash of the attribute fields the recommender sees, so the same
+attribute submitted again (in any request) is answered without an upstream round trip. An
+in-memory LRU tier sits in front of an optional SQLite tier that survives restarts and is shared
+by all worker processes on the host.
+
+Expired entries are kept for a grace period. Lookups return them flagged as stale, so callers
+can serve the last known good recommendations right away and refresh them in the background
+(stale-while-revalidate).
+
+Attributes the recommender has nothing for are remembered separately, in rotating Bloom filters,
+so they can be left out of upstream payloads at a memory cost of a few bits per attribute.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import daiquiri
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+# Attribute fields that determine the recommender output, in hashing order
+CACHE_KEY_FIELDS = ("name", "description", "entityDescription", "objectName")
+
+
+def attribute_cache_key(attribute: Dict[str, Any], model_version: str = "") -> str:
+    """
+    Compute the content hash identifying an attribute's recommendations.
+
+    :param attribute: Attribute dictionary
+    :param model_version: Version of the recommender model the recommendations come from, so
+        that a new model does not see entries of the old one ("" if unknown)
+    :return: Hex-encoded SHA-256 of the model version and the attribute's name, description,
+        entityDescription and objectName
+    """
+    fields = [attribute.get(field) for field in CACHE_KEY_FIELDS]
+    if model_version:
+        # Keys of an unknown version stay as they were before versions were tracked
+        fields.insert(0, model_version)
+    encoded = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# pylint: disable=too-few-public-methods
+class _CacheEntry:
+    """
+    A cached value with its expiry time, approximate size and source objectName.
+    """
+
+    __slots__ = ("value", "expires_at", "size", "object_name")
+
+    def __init__(
+        self,
+        value: List[Dict[str, Any]],
+        expires_at: float,
+        size: int,
+        object_name: str,
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.object_name = object_name
+
+
+class RecommendationCache:  # pylint: disable=too-many-instance-attributes
+    """
+    In-memory LRU cache with per-entry TTL and bounded entry count and byte size.
+
+    :param max_entries: Maximum number of entries (0 disables the cache)
+    :param max_bytes: Maximum approximate size in bytes of all cached values
+    :param ttl: Seconds an entry stays fresh after it is stored
+    :param grace: Seconds an expired entry is still served as stale (0 disables)
+    """
+
+    def __init__(
+        self, max_entries: int, max_bytes: int, ttl: float, grace: float = 0.0
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.grace = grace
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether the cache stores anything at all.
+        """
+        return self.max_entries > 0
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Approximate size in bytes of all cached values.
+        """
+        return self._bytes
+
+    def lookup(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Look up a key, dropping it once it is past its grace period.
+
+        :param key: Content hash of the attribute
+        :return: The cached recommendations and whether they are stale, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        if entry.expires_at + self.grace <= now:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        stale = entry.expires_at <= now
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return entry.value, stale
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up a key, ignoring stale entries.
+
+        :param key: Content hash of the attribute
+        :return: The cached recommendations, or None on a miss or a stale entry
+        """
+        found = self.lookup(key)
+        if found is None or found[1]:
+            return None
+        return found[0]
+
+    def set(
+        self,
+        key: str,
+        value: List[Dict[str, Any]],
+        object_name: str = "",
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Store a value, evicting least recently used entries to stay within bounds.
+
+        :param key: Content hash of the attribute
+        :param value: Normalized recommendations for the attribute
+        :param object_name: objectName of the file the attribute belongs to
+        :param ttl: Seconds the value stays fresh, if not the cache's TTL
+        :return: None
+        """
+        if not self.enabled:
+            return
+        size = len(json.dumps(value, ensure_ascii=False))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = _CacheEntry(
+            value, time.monotonic() + ttl, size, object_name
+        )
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Remove every entry.
+
+        :return: None
+        """
+        self._entries.clear()
+        self._bytes = 0
+
+    def discard(self, key: str) -> None:
+        """
+        Remove an entry if it is cached.
+
+        :param key: Content hash of the attribute
+        :return: None
+        """
+        if key in self._entries:
+            self._remove(key)
+
+    def purge(
+        self, object_name: Optional[str] = None, prefix: Optional[str] = None
+    ) -> int:
+        """
+        Remove the entries of a dataset file, the entries whose key starts with a prefix, or
+        every entry if neither is given.
+
+        :param object_name: objectName of the file whose entries are removed
+        :param prefix: Content hash prefix of the entries to remove
+        :return: Number of entries removed
+        """
+        if object_name is None and prefix is None:
+            removed = len(self._entries)
+            self.clear()
+            return removed
+        keys = [
+            key
+            for key, entry in self._entries.items()
+            if (object_name is None or entry.object_name == object_name)
+            and (prefix is None or key.startswith(prefix))
+        ]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters and sizes of the cache.
+
+        :return: Dictionary of statistics
+        """
+        return {
+            "entries": len(self),
+            "bytes": self.size_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over hex-encoded content hashes.
+
+    :param capacity: Number of keys the filter is sized for
+    :param error_rate: False positive rate at capacity
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # The keys already are SHA-256 digests, so two slices give independent hashes
+        first, second = int(key[:16], 16), int(key[16:32], 16) | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        """
+        Add a key.
+
+        :param key: Hex-encoded content hash
+        :return: None
+        """
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Memory used by the bit array.
+        """
+        return len(self._bits)
+
+
+class NegativeCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Remembers attributes the recommender returned no recommendations for.
+
+    Keys live in the current of two Bloom filter generations. The current generation is retired
+    once it is ``ttl`` seconds old or full, so an entry is remembered for between one and two
+    TTLs. Lookups may return a false positive at about ``error_rate``.
+
+    :param capacity: Keys per generation (0 disables the cache)
+    :param error_rate: False positive rate of a full generation
+    :param ttl: Seconds a generation accepts new keys before it is retired
+    """
+
+    def __init__(self, capacity: int, error_rate: float, ttl: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ttl = ttl
+        self.hits = 0
+        self.rotations = 0
+        self._current: Optional[BloomFilter] = None
+        self._previous: Optional[BloomFilter] = None
+        self._started = 0.0
+        self.clear()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether the cache records anything at all.
+        """
+        return self.capacity > 0
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Memory used by both generations.
+        """
+        return sum(
+            bloom.size_bytes for bloom in (self._current, self._previous) if bloom
+        )
+
+    def __len__(self) -> int:
+        return sum(bloom.count for bloom in (self._current, self._previous) if bloom)
+
+    def _rotate_if_due(self) -> None:
+        now = time.monotonic()
+        if now - self._started >= self.ttl or self._current.count >= self.capacity:
+            if now - self._started >= 2 * self.ttl:
+                self._previous = None
+            else:
+                self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._started = now
+            self.rotations += 1
+
+    def add(self, key: str) -> None:
+        """
+        Record that an attribute has no recommendations.
+
+        :param key: Content hash of the attribute
+        :return: None
+        """
+        if not self.enabled:
+            return
+        self._rotate_if_due()
+        self._current.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        if not self.enabled:
+            return False
+        self._rotate_if_due()
+        found = key in self._current or (
+            self._previous is not None and key in self._previous
+        )
+        if found:
+            self.hits += 1
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters and sizes of the cache.
+
+        :return: Dictionary of statistics
+        """
+        return {
+            "entries": len(self),
+            "bytes": self.size_bytes,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "rotations": self.rotations,
+        }
+
+    def clear(self) -> None:
+        """
+        Forget every key.
+
+        :return: None
+        """
+        self._previous = None
+        self._current = (
+            BloomFilter(self.capacity, self.error_rate) if self.enabled else None
+        )
+        self._started = time.monotonic()
+
+
+class SQLiteRecommendationStore:  # pylint: disable=too-many-instance-attributes
+    """
+    Persistent cache tier stored in a local SQLite database in WAL mode.
+
+    Reads are synchronous and meant to be run off the event loop. Writes are queued and flushed
+    in batches by a background thread so they never block the request path. Besides the
+    entries, the store keeps a few named values (e.g. the last seen model version) across
+    restarts.
+
+    :param path: Path of the SQLite database file
+    :param ttl: Seconds a stored entry stays fresh
+    :param flush_interval: Maximum seconds a queued write waits before it is flushed
+    :param batch_size: Maximum number of rows written per transaction
+    :param grace: Seconds an expired entry is still returned as stale
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS recommendations ("
+        "key TEXT PRIMARY KEY, object_name TEXT, value TEXT NOT NULL, "
+        "expires_at REAL NOT NULL) WITHOUT ROWID"
+    )
+    _INDEX = (
+        "CREATE INDEX IF NOT EXISTS recommendations_object_name "
+        "ON recommendations (object_name)"
+    )
+    _METADATA_SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS metadata "
+        "(name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+    )
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        path: str,
+        ttl: float,
+        *,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        grace: float = 0.0,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.grace = grace
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._reader.execute(self._SCHEMA)
+        self._reader.execute(self._INDEX)
+        self._reader.execute(self._METADATA_SCHEMA)
+        self._reader.execute(
+            "DELETE FROM recommendations WHERE expires_at <= ?",
+            (time.time() - grace,),
+        )
+        self._reader.commit()
+        # Rows to write; a value of None deletes the key's row instead
+        self._queue: "queue.Queue[Tuple[str, str, Optional[str], float]]" = (
+            queue.Queue()
+        )
+        # Number of queued deletes per key, whose rows reads must ignore until they are flushed
+        self._discarded: Dict[str, int] = {}
+        self._discarded_lock = threading.Lock()
+        self._metadata_lock = threading.Lock()
+        self._metadata: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="recommendation-cache-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def get_many(
+        self, keys: Iterable[str]
+    ) -> Dict[str, Tuple[List[Dict[str, Any]], str, float]]:
+        """
+        Look up several keys at once, ignoring rows past their grace period.
+
+        :param keys: Content hashes to look up
+        :return: Mapping of found keys to their cached recommendations, objectName and expiry
+            (as a time.time() value; in the past for stale rows)
+        """
+        keys = list(keys)
+        found: Dict[str, Tuple[List[Dict[str, Any]], str, float]] = {}
+        # Stay well below SQLite's limit on the number of bound parameters
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._read_lock:
+                rows = self._reader.execute(
+                    "SELECT key, object_name, value, expires_at FROM recommendations "
+                    f"WHERE key IN ({placeholders}) AND expires_at > ?",
+                    (*chunk, time.time() - self.grace),
+                ).fetchall()
+            for key, object_name, value, expires_at in rows:
+                found[key] = (json.loads(value), object_name, expires_at)
+        with self._discarded_lock:
+            for key in self._discarded.keys() & found.keys():
+                del found[key]
+        return found
+
+    def purge(
+        self, object_name: Optional[str] = None, prefix: Optional[str] = None
+    ) -> int:
+        """
+        Delete the rows of a dataset file, the rows whose key starts with a prefix, or every row
+        if neither is given. Queued writes are flushed first so they cannot bring purged rows
+        back.
+
+        :param object_name: objectName of the file whose rows are deleted
+        :param prefix: Content hash prefix (hex digits only) of the rows to delete
+        :return: Number of rows deleted
+        """
+        conditions = []
+        parameters: List[Any] = []
+        if object_name is not None:
+            conditions.append("object_name = ?")
+            parameters.append(object_name)
+        if prefix is not None:
+            conditions.append("key LIKE ?")
+            parameters.append(f"{prefix}%")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._read_lock:
+            self.flush(self._reader)
+            with self._reader:
+                cursor = self._reader.execute(
+                    f"DELETE FROM recommendations{where}", parameters
+                )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Row count, file size and write backlog of the store.
+
+        :return: Dictionary of statistics
+        """
+        with self._read_lock:
+            (entries,) = self._reader.execute(
+                "SELECT COUNT(*) FROM recommendations"
+            ).fetchone()
+            (pages,) = self._reader.execute("PRAGMA page_count").fetchone()
+            (page_size,) = self._reader.execute("PRAGMA page_size").fetchone()
+        return {
+            "entries": entries,
+            "bytes": pages * page_size,
+            "pending_writes": self._queue.qsize(),
+            "path": self.path,
+        }
+
+    def put(self, key: str, value: List[Dict[str, Any]], object_name: str = "") -> None:
+        """
+        Queue an entry for the next batched write.
+
+        :param key: Content hash of the attribute
+        :param value: Normalized recommendations for the attribute
+        :param object_name: objectName of the file the attribute belongs to
+        :return: None
+        """
+        self._queue.put(
+            (
+                key,
+                object_name,
+                json.dumps(value, ensure_ascii=False),
+                time.time() + self.ttl,
+            )
+        )
+
+    def get_metadata(self, name: str) -> Optional[str]:
+        """
+        Read a named value, including one still waiting to be written.
+
+        :param name: Name of the value
+        :return: The value, or None if it was never set
+        """
+        with self._metadata_lock:
+            if name in self._metadata:
+                return self._metadata[name]
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT value FROM metadata WHERE name = ?", (name,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set_metadata(self, name: str, value: str) -> None:
+        """
+        Queue a named value for the next batched write.
+
+        :param name: Name of the value
+        :param value: The value
+        :return: None
+        """
+        with self._metadata_lock:
+            self._metadata[name] = value
+
+    def discard(self, key: str) -> None:
+        """
+        Queue the deletion of a key's row. Reads ignore the row from now on.
+
+        :param key: Content hash of the attribute
+        :return: None
+        """
+        with self._discarded_lock:
+            self._discarded[key] = self._discarded.get(key, 0) + 1
+        self._queue.put((key, "", None, 0.0))
+
+    def flush(self, connection: sqlite3.Connection) -> int:
+        """
+        Write queued entries in batches until the queue is empty.
+
+        :param connection: Connection owned by the writing thread
+        :return: Number of rows written
+        """
+        with self._metadata_lock:
+            metadata, self._metadata = self._metadata, {}
+        if metadata:
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                        metadata.items(),
+                    )
+            except sqlite3.Error as e:
+                logger.error("Failed to write cache metadata: %s", e)
+        written = 0
+        while True:
+            rows = []
+            while len(rows) < self.batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not rows:
+                return written
+            # Only the last write of each key in the batch counts
+            latest = {row[0]: row for row in rows}
+            try:
+                with connection:
+                    connection.executemany(
+                        "DELETE FROM recommendations WHERE key = ?",
+                        [(row[0],) for row in latest.values() if row[2] is None],
+                    )
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO recommendations "
+                        "(key, object_name, value, expires_at) VALUES (?, ?, ?, ?)",
+                        [row for row in latest.values() if row[2] is not None],
+                    )
+                written += len(rows)
+            except sqlite3.Error as e:
+                logger.error("Failed to write %d cache rows: %s", len(rows), e)
+            finally:
+                self._forget_discarded(row[0] for row in rows if row[2] is None)
+
+    def _forget_discarded(self, keys: Iterable[str]) -> None:
+        with self._discarded_lock:
+            for key in keys:
+                self._discarded[key] -= 1
+                if not self._discarded[key]:
+                    del self._discarded[key]
+
+    def _write_loop(self) -> None:
+        connection = self._connect()
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush(connection)
+            self.flush(connection)
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        """
+        Flush queued writes and close the database.
+
+        :return: None
+        """
+        self._stop.set()
+        self._writer.join()
+        with self._read_lock:
+            self._reader.close()
+
+
+class TieredRecommendationCache:
+    """
+    Two-tier recommendation cache: an in-memory LRU in front of an optional SQLite store.
+
+    :param memory: The in-memory (L1) tier
+    """
+
+    def __init__(self, memory: RecommendationCache):
+        self.memory = memory
+        self.store: Optional[SQLiteRecommendationStore] = None
+
+    def open_store(self, path: str, ttl: float, **kwargs: Any) -> None:
+        """
+        Attach the persistent (L2) tier.
+
+        :param path: Path of the SQLite database file
+        :param ttl: Seconds a stored entry stays fresh
+        :param kwargs: Extra keyword arguments passed to SQLiteRecommendationStore
+        :return: None
+        """
+        if self.store is None:
+            self.store = SQLiteRecommendationStore(path, ttl, **kwargs)
+            logger.info("Opened persistent recommendation cache at %s.", path)
+
+    def close_store(self) -> None:
+        """
+        Flush and detach the persistent (L2) tier.
+
+        :return: None
+        """
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    async def get_many(
+        self, keys: Iterable[str]
+    ) -> Dict[str, Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Look up keys in memory first, then in the persistent tier, promoting L2 hits to memory
+        with their remaining freshness.
+
+        :param keys: Content hashes to look up
+        :return: Mapping of found keys to their cached recommendations and whether they are stale
+        """
+        found: Dict[str, Tuple[List[Dict[str, Any]], bool]] = {}
+        missing = []
+        for key in keys:
+            hit = self.memory.lookup(key)
+            if hit is None:
+                missing.append(key)
+            else:
+                found[key] = hit
+        if missing and self.store is not None:
+            try:
+                stored = await asyncio.to_thread(self.store.get_many, missing)
+            except sqlite3.Error as e:
+                logger.error("Failed to read persistent recommendation cache: %s", e)
+                stored = {}
+            now = time.time()
+            for key, (value, object_name, expires_at) in stored.items():
+                self.memory.set(key, value, object_name, ttl=expires_at - now)
+                found[key] = (value, expires_at <= now)
+        return found
+
+    def set(self, key: str, value: List[Dict[str, Any]], object_name: str = "") -> None:
+        """
+        Store a value in memory and queue it for the persistent tier.
+
+        :param key: Content hash of the attribute
+        :param value: Normalized recommendations for the attribute
+        :param object_name: objectName of the file the attribute belongs to
+        :return: None
+        """
+        self.memory.set(key, value, object_name)
+        if self.store is not None:
+            self.store.put(key, value, object_name)
+
+    def discard(self, key: str) -> None:
+        """
+        Remove an entry from memory and queue its removal from the persistent tier.
+
+        :param key: Content hash of the attribute
+        :return: None
+        """
+        self.memory.discard(key)
+        if self.store is not None:
+            self.store.discard(key)
+
+    def get_metadata(self, name: str) -> Optional[str]:
+        """
+        Read a named value kept by the persistent tier.
+
+        :param name: Name of the value
+        :return: The value, or None without a persistent tier or if it was never set
+        """
+        if self.store is None:
+            return None
+        try:
+            return self.store.get_metadata(name)
+        except sqlite3.Error as e:
+            logger.error("Failed to read persistent cache metadata: %s", e)
+            return None
+
+    def set_metadata(self, name: str, value: str) -> None:
+        """
+        Queue a named value for the persistent tier, if there is one.
+
+        :param name: Name of the value
+        :param value: The value
+        :return: None
+        """
+        if self.store is not None:
+            self.store.set_metadata(name, value)
+
+    def clear(self) -> None:
+        """
+        Remove every in-memory entry.
+
+        :return: None
+        """
+        self.memory.clear()
+
+    async def purge(
+        self, object_name: Optional[str] = None, prefix: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Remove matching entries from both tiers (every entry if no filter is given).
+
+        :param object_name: objectName of the file whose entries are removed
+        :param prefix: Content hash prefix of the entries to remove
+        :return: Number of entries removed per tier
+        """
+        removed = {"memory": self.memory.purge(object_name, prefix)}
+        if self.store is not None:
+            removed["persistent"] = await asyncio.to_thread(
+                self.store.purge, object_name, prefix
+            )
+        return removed
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Statistics of both tiers.
+
+        :return: Dictionary of statistics per tier (``persistent`` is None without a store)
+        """
+        persistent = None
+        if self.store is not None:
+            persistent = await asyncio.to_thread(self.store.stats)
+        return {"memory": self.memory.stats(), "persistent": persistent}
@@ -0,0 +1,145 @@
+"""
+Circuit breaker protecting the app from a degraded upstream recommender.
+
+The breaker tracks the outcome of recent upstream calls. When too many of them fail or are too
+slow it opens, and later calls fail fast with CircuitOpenError instead of waiting for the full
+upstream timeout. After a cool-down a single probe call is let through; its outcome decides
+whether the breaker closes again.
+"""
+
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional
+
+import daiquiri
+import httpx
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the upstream while the circuit is open.
+    """
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """
+    Whether an error reflects upstream health (as opposed to a bad request).
+
+    :param error: The error raised by the upstream call
+    :return: True if the error should count against the upstream
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.HTTPError, ValueError))
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+    Count-based rolling-window circuit breaker for async calls.
+
+    :param failure_rate: Fraction of failed or slow calls in the window that opens the circuit
+    :param min_calls: Minimum number of calls in the window before the rate is evaluated
+    :param window: Number of most recent calls tracked
+    :param slow_call: Seconds after which a successful call still counts as a failure
+    :param reset_timeout: Seconds the circuit stays open before a probe call is allowed
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        failure_rate: float,
+        *,
+        min_calls: int,
+        window: int,
+        slow_call: float,
+        reset_timeout: float,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go upstream now, moving an expired open circuit to half-open.
+
+        :return: True if the call may proceed
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record(self, success: bool) -> None:
+        """
+        Record the outcome of a call and update the circuit state.
+
+        :param success: Whether the call succeeded within the slow-call threshold
+        :return: None
+        """
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if success:
+                logger.info("Recommender circuit closed after a successful probe.")
+                self.state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (
+            len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_rate
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        logger.error(
+            "Recommender circuit opened; failing fast for %s s.", self.reset_timeout
+        )
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """
+        Run an async call through the breaker.
+
+        :param func: Coroutine function performing the upstream call
+        :param args: Positional arguments for func
+        :return: The result of func
+        :raises CircuitOpenError: If the circuit is open
+        """
+        if not self.allow():
+            raise CircuitOpenError("Recommender circuit is open.")
+        start = time.monotonic()
+        try:
+            result = await func(*args)
+        except BaseException as e:
+            if is_upstream_failure(e):
+                self.record(False)
+            elif self.state == HALF_OPEN:
+                # Cancelled or rejected probes leave the outcome undecided
+                self._probing = False
+            raise
+        self.record(time.monotonic() - start < self.slow_call)
+        return result
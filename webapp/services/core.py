@@ -2,20 +2,45 @@
 Core business logic and data models for the Semantic EML Annotator Backend.
 """
 
+import asyncio
+import json
+from collections import defaultdict
 from itertools import groupby
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 import smtplib
-import requests
+import daiquiri
+import httpx
 from webapp.config import Config
-from webapp.utils.utils import merge_recommender_results
+from webapp.services.batching import RecommenderBatcher
+from webapp.services.cache import (
+    CACHE_KEY_FIELDS,
+    NegativeCache,
+    RecommendationCache,
+    TieredRecommendationCache,
+    attribute_cache_key,
+)
+from webapp.services.circuit_breaker import CircuitOpenError
+from webapp.services.recommender_client import (
+    add_model_version_listener,
+    model_version,
+    post_recommendations,
+    restore_model_version,
+)
+from webapp.services.retry import RetryBudget, call_with_retry
+from webapp.services.singleflight import SingleFlight, payload_key
+from webapp.utils.serialization import JSONSlot, JSONTemplate
+from webapp.utils.utils import ConceptTable, chunk_items, merge_recommender_results
 from webapp.models.mock_objects import (
     MOCK_RAW_ATTRIBUTE_RECOMMENDATIONS_BY_FILE,
     MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS,
 )
 from webapp.models.proposal_request import ProposalRequest
 
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
 
 def send_email_notification(proposal: ProposalRequest) -> None:
     """
@@ -86,79 +111,670 @@ def _normalize_recommender_response(raw_response):
     return recommender_response
 
 
-# pylint: disable=too-many-locals
-def recommend_for_attribute(
-    attributes: List[Dict[str, Any]], request_id: str = None
+# Shared by all requests so that concurrent file groups can be batched into one upstream call
+_batcher = RecommenderBatcher(post_recommendations, _normalize_recommender_response)
+
+# Shared by all requests so that identical concurrent upstream payloads are sent only once
+_inflight = SingleFlight()
+
+# Shared by all requests so that repeated attributes are answered without an upstream call
+_cache = TieredRecommendationCache(
+    RecommendationCache(
+        Config.RECOMMENDATION_CACHE_MAX_ENTRIES,
+        Config.RECOMMENDATION_CACHE_MAX_BYTES,
+        Config.RECOMMENDATION_CACHE_TTL,
+        Config.RECOMMENDATION_CACHE_GRACE,
+    )
+)
+
+# Shared by all requests so that attributes known to get no recommendations are not sent again
+_negative_cache = NegativeCache(
+    Config.RECOMMENDATION_NEGATIVE_CACHE_CAPACITY,
+    Config.RECOMMENDATION_NEGATIVE_CACHE_ERROR_RATE,
+    Config.RECOMMENDATION_NEGATIVE_CACHE_TTL,
+)
+
+# Geographic coverage recommendations serialized once; each request only fills in its request_id
+_GEOGRAPHICCOVERAGE_TEMPLATES = [
+    JSONTemplate(
+        {
+            **item,
+            "recommendations": [
+                {**rec, "request_id": JSONSlot("request_id")}
+                for rec in item.get("recommendations", [])
+            ],
+        }
+    )
+    for item in MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS
+]
+
+# Cache keys of stale entries currently being refreshed in the background
+_revalidating: Set[str] = set()
+
+# Name under which the persistent tier remembers the last seen model version
+_MODEL_VERSION_METADATA = "model_version"
+
+# Remembered so that cache keys built right after a restart still match the stored entries
+add_model_version_listener(
+    lambda version: _cache.set_metadata(_MODEL_VERSION_METADATA, version)
+)
+
+
+def open_recommendation_cache() -> None:
+    """
+    Attach the persistent recommendation cache tier when a database path is configured, and
+    restore the model version it last saw.
+
+    :return: None
+    """
+    if Config.RECOMMENDATION_CACHE_DB_PATH:
+        _cache.open_store(
+            Config.RECOMMENDATION_CACHE_DB_PATH,
+            Config.RECOMMENDATION_CACHE_DB_TTL,
+            flush_interval=Config.RECOMMENDATION_CACHE_DB_FLUSH_INTERVAL,
+            batch_size=Config.RECOMMENDATION_CACHE_DB_BATCH_SIZE,
+            grace=Config.RECOMMENDATION_CACHE_GRACE,
+        )
+        restore_model_version(_cache.get_metadata(_MODEL_VERSION_METADATA))
+
+
+def close_recommendation_cache() -> None:
+    """
+    Flush pending writes and detach the persistent recommendation cache tier.
+
+    :return: None
+    """
+    _cache.close_store()
+
+
+async def recommendation_cache_stats() -> Dict[str, Any]:
+    """
+    Statistics of every recommendation cache tier.
+
+    :return: Counters, entry counts and sizes of the memory, persistent and negative caches
+    """
+    stats = await _cache.stats()
+    stats["negative"] = _negative_cache.stats()
+    return stats
+
+
+async def purge_recommendation_cache(
+    object_name: Optional[str] = None, prefix: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Remove cached recommendations of a dataset file, with a content hash prefix, or all of them.
+    The negative cache cannot forget single attributes, so it is only cleared by a full purge.
+
+    :param object_name: objectName of the file whose entries are removed
+    :param prefix: Content hash prefix of the entries to remove
+    :return: Number of entries removed per tier, and whether the negative cache was cleared
+    """
+    removed: Dict[str, Any] = await _cache.purge(object_name, prefix)
+    removed["negative"] = object_name is None and prefix is None
+    if removed["negative"]:
+        _negative_cache.clear()
+    logger.info(
+        "Purged recommendation cache (objectName=%s, prefix=%s): %s",
+        object_name,
+        prefix,
+        removed,
+    )
+    return removed
+
+
+# pylint: disable=too-few-public-methods
+class _AttributeRequest:  # pylint: disable=too-many-instance-attributes
+    """
+    Per-request state shared by the file groups of one recommend_for_attribute call.
+
+    :param request_id: The request UUID to include in each recommendation object
+    :param max_concurrency: Maximum number of concurrent upstream calls for this request
+    :param use_cache: Whether to read and write the recommendation cache
+    :param merge_config: Merge configuration for the attribute results
+    :param deadline: Event loop time by which results are returned, or None for no budget
+    :param table: Concept table to build the normalized response shape into, or None
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        request_id: Optional[str],
+        *,
+        max_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        merge_config: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+        table: Optional[ConceptTable] = None,
+    ):
+        self.request_id = request_id
+        self.semaphore = asyncio.Semaphore(
+            max_concurrency or Config.RECOMMENDER_MAX_CONCURRENCY
+        )
+        self.use_cache = use_cache
+        self.merge_config = merge_config
+        self.deadline = deadline
+        self.table = table
+        self.retry_budget = RetryBudget(Config.RECOMMENDER_RETRY_BUDGET)
+        # Fixed for the request, so its cache keys stay consistent if the model changes mid-way
+        self.model_version = model_version()
+
+    def cache_key(self, attribute: Dict[str, Any]) -> str:
+        """
+        Cache key of an attribute under the model version seen when the request started.
+
+        :param attribute: Attribute dictionary
+        :return: Hex-encoded content hash
+        """
+        return attribute_cache_key(attribute, self.model_version)
+
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left in the request's latency budget.
+
+        :return: Remaining seconds (never negative), or None if the request has no budget
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - asyncio.get_running_loop().time())
+
+
+def _chunk_misses(
+    misses: List[Tuple[str, Dict[str, Any]]],
+) -> List[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Splits the cache misses of a file group into upstream chunks bounded by
+    Config.RECOMMENDER_MAX_CHUNK_ATTRIBUTES and Config.RECOMMENDER_MAX_CHUNK_BYTES.
+
+    :param misses: (cache key, attribute) tuples to send upstream
+    :return: List of chunks, each a list of (cache key, attribute) tuples
+    """
+    return chunk_items(
+        misses,
+        Config.RECOMMENDER_MAX_CHUNK_ATTRIBUTES,
+        Config.RECOMMENDER_MAX_CHUNK_BYTES,
+        size_of=lambda miss: len(json.dumps(miss[1], ensure_ascii=False)),
+    )
+
+
+async def _send_chunk(
+    object_name: str,
+    chunk: List[Tuple[str, Dict[str, Any]]],
+    context: _AttributeRequest,
+) -> List[Dict[str, Any]]:
+    """
+    Sends one chunk of a file group upstream, retrying transient failures within the request's
+    retry budget and deadline, and caches the per-attribute results. Identical chunks of
+    concurrent requests share one upstream call.
+
+    :param object_name: The objectName shared by the attributes of this group
+    :param chunk: (cache key, attribute) tuples to send upstream
+    :param context: Per-request state
+    :return: Normalized recommendations for the chunk
+    :raises httpx.HTTPError: If the upstream call fails
+    :raises ValueError: If the upstream response is not valid JSON
+    :raises CircuitOpenError: If the circuit is open
+    """
+    # Only the fields that determine the recommendations (and the cache key) go upstream
+    api_payload = [
+        {field: i[field] for field in CACHE_KEY_FIELDS if field in i} for _, i in chunk
+    ]
+    columns = {i.get("name") for _, i in chunk}
+    flight_key = payload_key(api_payload)
+
+    async def submit() -> List[Dict[str, Any]]:
+        # Backoff sleeps happen outside the semaphore so they do not hold a slot
+        async with context.semaphore:
+            return await _inflight.do(
+                flight_key, lambda: _batcher.submit(api_payload, columns)
+            )
+
+    fetched = await call_with_retry(submit, context.retry_budget, context.remaining)
+    if context.use_cache:
+        by_column: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for rec in fetched:
+            by_column[rec.get("column_name")].append(rec)
+        # Stored under the model version that answered, which may be newer than the request's
+        version = model_version()
+        for _, attribute in chunk:
+            key = attribute_cache_key(attribute, version)
+            recommendations = by_column.get(attribute.get("name"), [])
+            if not recommendations and _negative_cache.enabled:
+                _negative_cache.add(key)
+                if key in _revalidating:
+                    # Otherwise the older answer would still be served (stale) and refreshed
+                    _cache.discard(key)
+            else:
+                _cache.set(key, recommendations, object_name)
+    return fetched
+
+
+async def _revalidate(
+    object_name: str, stale: List[Tuple[str, Dict[str, Any]]]
+) -> None:
+    """
+    Refreshes stale cache entries of a file group from the upstream recommender.
+
+    :param object_name: The objectName shared by the attributes
+    :param stale: (cache key, attribute) tuples whose cache entries are stale
+    :return: None
+    """
+    context = _AttributeRequest(None)
+    try:
+        outcomes = await asyncio.gather(
+            *(
+                _send_chunk(object_name, chunk, context)
+                for chunk in _chunk_misses(stale)
+            ),
+            return_exceptions=True,
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logger.warning(
+                    "Failed to refresh stale recommendations of %s: %r",
+                    object_name,
+                    outcome,
+                )
+    finally:
+        _revalidating.difference_update(key for key, _ in stale)
+
+
+def _schedule_revalidation(
+    object_name: str, stale: List[Tuple[str, Dict[str, Any]]]
+) -> None:
+    """
+    Starts a background refresh of the stale entries that are not already being refreshed.
+
+    :param object_name: The objectName shared by the attributes
+    :param stale: (cache key, attribute) tuples whose cache entries are stale
+    :return: None
+    """
+    stale = [(key, attribute) for key, attribute in stale if key not in _revalidating]
+    if not stale:
+        return
+    _revalidating.update(key for key, _ in stale)
+    task = asyncio.ensure_future(_revalidate(object_name, stale))
+    _background_groups.add(task)
+    task.add_done_callback(_background_groups.discard)
+
+
+async def _fetch_attribute_recommendations(  # pylint: disable=too-many-locals
+    object_name: str,
+    file_attributes: List[Dict[str, Any]],
+    context: _AttributeRequest,
+) -> Tuple[List[Dict[str, Any]], Set[str], Set[str]]:
+    """
+    Gets normalized recommendations for a file group, sending only cache misses upstream. Large
+    groups are split into bounded chunks that are sent concurrently and reassembled in order.
+    Stale cache entries are served as they are and refreshed in the background, and attributes
+    in the negative cache are left out of the upstream payloads.
+
+    :param object_name: The objectName shared by the attributes of this group
+    :param file_attributes: List of attribute dictionaries belonging to this file
+    :param context: Per-request state
+    :return: Normalized recommendations for the group, the cache keys of the attributes that
+        were skipped because their upstream call failed or the circuit is open, and the cache
+        keys of the attributes served from stale cache entries
+    """
+    keyed = {context.cache_key(attribute): attribute for attribute in file_attributes}
+    cached = await _cache.get_many(keyed) if context.use_cache else {}
+    recommender_response: List[Dict[str, Any]] = []
+    misses = []
+    stale = []
+    for key, attribute in keyed.items():
+        if key in cached:
+            value, is_stale = cached[key]
+            recommender_response.extend(value)
+            if is_stale:
+                stale.append((key, attribute))
+        elif not (context.use_cache and key in _negative_cache):
+            misses.append((key, attribute))
+    if stale:
+        _schedule_revalidation(object_name, stale)
+    stale_keys = {key for key, _ in stale}
+    if not misses:
+        return recommender_response, set(), stale_keys
+    chunks = _chunk_misses(misses)
+    outcomes = await asyncio.gather(
+        *(_send_chunk(object_name, chunk, context) for chunk in chunks),
+        return_exceptions=True,
+    )
+    skipped: Set[str] = set()
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, (httpx.HTTPError, ValueError, CircuitOpenError)):
+            logger.warning(
+                "Skipping %d attributes of %s: %r", len(chunk), object_name, outcome
+            )
+            skipped.update(key for key, _ in chunk)
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            recommender_response.extend(outcome)
+    return recommender_response, skipped, stale_keys
+
+
+async def _recommend_for_file_group(
+    object_name: str,
+    file_attributes: List[Dict[str, Any]],
+    context: _AttributeRequest,
 ) -> List[Dict[str, Any]]:
     """
-    Groups attributes by objectName, sends to API (or gets mock per file), and merges results.
+    Gets recommendations for the attributes of a single file (objectName) and merges them.
+
+    :param object_name: The objectName shared by the attributes of this group
+    :param file_attributes: List of attribute dictionaries belonging to this file
+    :param context: Per-request state
+    :return: List of merged recommendation results for this file. Attributes that could not be
+        recommended because the upstream failed are reported with an empty recommendation list
+        and ``"status": "skipped"``.
+    """
+    skipped_keys: Set[str] = set()
+    stale_keys: Set[str] = set()
+    if Config.USE_MOCK_RECOMMENDATIONS:
+        recommender_response = MOCK_RAW_ATTRIBUTE_RECOMMENDATIONS_BY_FILE.get(
+            object_name, []
+        )
+    else:
+        # REAL API LOGIC
+        (
+            recommender_response,
+            skipped_keys,
+            stale_keys,
+        ) = await _fetch_attribute_recommendations(
+            object_name, file_attributes, context
+        )
+    # Merge results for this file group
+    file_results = merge_recommender_results(
+        file_attributes,
+        recommender_response,
+        "ATTRIBUTE",
+        context.merge_config,
+        context.table,
+    )
+    # Add request_id to each recommendation in each result; the normalized shape carries it once
+    # at the top level of the response instead
+    if context.table is None:
+        for item in file_results:
+            for rec in item.get("recommendations", []):
+                rec["request_id"] = context.request_id
+    if stale_keys:
+        stale_ids = {
+            attribute["id"]
+            for attribute in file_attributes
+            if context.cache_key(attribute) in stale_keys
+        }
+        for item in file_results:
+            if item["id"] in stale_ids:
+                item["stale"] = True
+    if skipped_keys:
+        file_results.extend(
+            {"id": attribute["id"], "recommendations": [], "status": "skipped"}
+            for attribute in file_attributes
+            if context.cache_key(attribute) in skipped_keys
+        )
+    return file_results
+
+
+def _group_by_object_name(
+    attributes: List[Dict[str, Any]],
+) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Sorts attributes by objectName and groups them per file.
+
+    :param attributes: List of attribute dictionaries (sorted in place)
+    :return: List of (objectName, attributes) tuples in objectName order
+    """
+    attributes.sort(key=lambda x: x.get("objectName", "unknown"))
+    return [
+        (object_name, list(group_iter))
+        for object_name, group_iter in groupby(
+            attributes, key=lambda x: x.get("objectName", "unknown")
+        )
+    ]
+
+
+# Groups still running after their request's budget ran out, kept so they can fill the cache
+_background_groups: Set[asyncio.Task] = set()
+
+
+def _mark_complete(file_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Marks merged results of a finished group as complete (skipped results keep their status).
+
+    :param file_results: Merged recommendation results of a file group
+    :return: The same results
+    """
+    for item in file_results:
+        item.setdefault("status", "complete")
+    return file_results
+
+
+def _pending_results(file_attributes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Placeholder results for the attributes of a group that did not finish within the budget.
+
+    :param file_attributes: List of attribute dictionaries belonging to the group
+    :return: One ``{"id", "recommendations": [], "status": "pending"}`` entry per attribute
+    """
+    return [
+        {"id": attribute["id"], "recommendations": [], "status": "pending"}
+        for attribute in file_attributes
+    ]
+
+
+def _release_unfinished(
+    tasks: Iterable[asyncio.Task], context: _AttributeRequest
+) -> None:
+    """
+    Lets groups that missed the budget finish in the background so their results reach the
+    cache, or cancels them if the request does not use the cache.
+
+    :param tasks: Unfinished file group tasks
+    :param context: Per-request state
+    :return: None
+    """
+    for task in tasks:
+        if context.use_cache and not Config.USE_MOCK_RECOMMENDATIONS:
+            _background_groups.add(task)
+            task.add_done_callback(_background_groups.discard)
+        else:
+            task.cancel()
+
+
+# pylint: disable=too-many-arguments
+async def recommend_for_attribute(
+    attributes: List[Dict[str, Any]],
+    request_id: str = None,
+    *,
+    max_concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    merge_config: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+    table: Optional[ConceptTable] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Groups attributes by objectName, sends the groups concurrently to the API through the pooled
+    recommender client (or gets mock per file), and merges results in objectName order.
+
+    With a deadline, the groups share one latency budget: whatever is ready when it runs out is
+    returned with ``"status": "complete"``, and the attributes of unfinished groups are returned
+    with ``"status": "pending"``.
 
     :param attributes: List of attribute dictionaries
     :param request_id: The request UUID to include in each recommendation object
+    :param max_concurrency: Maximum concurrent upstream calls (defaults to
+        Config.RECOMMENDER_MAX_CONCURRENCY)
+    :param use_cache: Whether to read and write the recommendation cache
+    :param merge_config: Merge configuration (defaults to Config.MERGE_CONFIG["ATTRIBUTE"])
+    :param deadline: Event loop time by which to return, or None to wait for every group
+    :param table: Concept table to build the normalized response shape into, or None for the
+        default shape
     :return: List of merged recommendation results for attributes
     """
-    api_url = Config.API_URL
-    attributes.sort(key=lambda x: x.get("objectName", "unknown"))
-    final_output: List[Dict[str, Any]] = []
-    # Group by File (object_name)
-    for object_name, group_iter in groupby(
-        attributes, key=lambda x: x.get("objectName", "unknown")
-    ):
-        file_attributes = list(group_iter)
-        recommender_response: List[Dict[str, Any]] = []
-        if Config.USE_MOCK_RECOMMENDATIONS:
-            recommender_response = MOCK_RAW_ATTRIBUTE_RECOMMENDATIONS_BY_FILE.get(
-                object_name, []
+    context = _AttributeRequest(
+        request_id,
+        max_concurrency=max_concurrency,
+        use_cache=use_cache,
+        merge_config=merge_config,
+        deadline=deadline,
+        table=table,
+    )
+    groups = _group_by_object_name(attributes)
+    if deadline is None:
+        # gather returns results in submission order, so the output order is deterministic
+        group_results = await asyncio.gather(
+            *(
+                _recommend_for_file_group(object_name, file_attributes, context)
+                for object_name, file_attributes in groups
             )
-            # Merge results for this file group using the retrieved mock data
-            file_results = merge_recommender_results(
-                file_attributes, recommender_response, "ATTRIBUTE"
+        )
+    else:
+        tasks = [
+            asyncio.ensure_future(
+                _recommend_for_file_group(object_name, file_attributes, context)
             )
-            # Add request_id to each recommendation in each result
-            for item in file_results:
-                for rec in item.get("recommendations", []):
-                    rec["request_id"] = request_id
-            final_output.extend(file_results)
-        else:
-            # REAL API LOGIC
-            api_payload = [
-                {k: v for k, v in i.items() if k != "id"} for i in file_attributes
-            ]
-            try:
-                response = requests.post(api_url, json=api_payload, timeout=60)
-                response.raise_for_status()
-                raw_response = response.json()
-                recommender_response = _normalize_recommender_response(raw_response)
-            except requests.exceptions.RequestException as e:
-                print(f"An error occurred for {object_name}: {e}")
-                continue
-            # Merge results for this file group
-            file_results = merge_recommender_results(
-                file_attributes, recommender_response, "ATTRIBUTE"
+            for object_name, file_attributes in groups
+        ]
+        if tasks:
+            await asyncio.wait(tasks, timeout=context.remaining())
+        group_results = [
+            (
+                _mark_complete(task.result())
+                if task.done()
+                else _pending_results(file_attributes)
             )
-            for item in file_results:
-                for rec in item.get("recommendations", []):
-                    rec["request_id"] = request_id
-            final_output.extend(file_results)
+            for task, (_, file_attributes) in zip(tasks, groups)
+        ]
+        _release_unfinished([task for task in tasks if not task.done()], context)
+    final_output: List[Dict[str, Any]] = []
+    for file_results in group_results:
+        final_output.extend(file_results)
     return final_output
 
 
-def recommend_for_geographic_coverage(
-    geos: List[Dict[str, Any]], request_id: str = None
+# pylint: disable=too-many-arguments
+async def iter_recommendations_for_attribute(
+    attributes: List[Dict[str, Any]],
+    request_id: str = None,
+    *,
+    max_concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    merge_config: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+    table: Optional[ConceptTable] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Like recommend_for_attribute, but yields the merged results of each file group as soon as
+    that group completes, in completion order. With a deadline, the groups still unfinished when
+    it passes are yielded last as pending.
+
+    :param attributes: List of attribute dictionaries
+    :param request_id: The request UUID to include in each recommendation object
+    :param max_concurrency: Maximum concurrent upstream calls (defaults to
+        Config.RECOMMENDER_MAX_CONCURRENCY)
+    :param use_cache: Whether to read and write the recommendation cache
+    :param merge_config: Merge configuration (defaults to Config.MERGE_CONFIG["ATTRIBUTE"])
+    :param deadline: Event loop time by which to finish, or None to wait for every group
+    :param table: Concept table to build the normalized response shape into, or None for the
+        default shape
+    :return: Async iterator over the merged recommendation results of each file group
+    """
+    context = _AttributeRequest(
+        request_id,
+        max_concurrency=max_concurrency,
+        use_cache=use_cache,
+        merge_config=merge_config,
+        deadline=deadline,
+        table=table,
+    )
+    groups = {
+        asyncio.ensure_future(
+            _recommend_for_file_group(object_name, file_attributes, context)
+        ): file_attributes
+        for object_name, file_attributes in _group_by_object_name(attributes)
+    }
+    pending = set(groups)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=context.remaining(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for task in done:
+                file_results = task.result()
+                yield file_results if deadline is None else _mark_complete(file_results)
+        if pending:
+            _release_unfinished(pending, context)
+            for task in pending:
+                yield _pending_results(groups[task])
+            pending = set()
+    finally:
+        # The consumer may stop early (e.g. the client disconnected)
+        for task in pending:
+            task.cancel()
+
+
+# pylint: disable=too-many-arguments
+async def recommend_for_geographic_coverage(
+    geos: List[Dict[str, Any]],
+    request_id: str = None,
+    *,
+    max_concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    merge_config: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+    table: Optional[ConceptTable] = None,
 ) -> List[Dict[str, Any]]:
     """
     Stub recommender for geographic coverage elements.
 
     :param geos: List of geographic coverage dictionaries
     :param request_id: The request UUID to include in each recommendation object
+    :param max_concurrency: Unused by the stub
+    :param use_cache: Unused by the stub
+    :param merge_config: Unused by the stub
+    :param deadline: Unused by the stub
+    :param table: Concept table to build the normalized response shape into, or None for the
+        default shape
     :return: Mock recommendations if enabled, otherwise an empty list
     """
     # pylint: disable=unused-argument
     if Config.USE_MOCK_RECOMMENDATIONS:
-        results = MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS.copy()
+        if table is not None:
+            return table.normalize_results(MOCK_GEOGRAPHICCOVERAGE_RECOMMENDATIONS)
         # Add request_id to each recommendation in each result
-        for item in results:
-            for rec in item.get("recommendations", []):
-                rec["request_id"] = request_id
-        return results
+        return [
+            template.render(request_id=request_id)
+            for template in _GEOGRAPHICCOVERAGE_TEMPLATES
+        ]
+    return []
+
+
+# pylint: disable=too-many-arguments
+async def recommend_for_datatable(
+    tables: List[Dict[str, Any]],
+    request_id: str = None,
+    *,
+    max_concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    merge_config: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+    table: Optional[ConceptTable] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Stub recommender for data table (entity-level) elements. No entity recommender exists yet, so
+    no recommendations are returned.
+
+    :param tables: List of data table dictionaries
+    :param request_id: The request UUID to include in each recommendation object
+    :param max_concurrency: Unused by the stub
+    :param use_cache: Unused by the stub
+    :param merge_config: Unused by the stub
+    :param deadline: Unused by the stub
+    :param table: Unused by the stub
+    :return: An empty list
+    """
+    # pylint: disable=unused-argument
     return []
@@ -0,0 +1,125 @@
+"""
+Hedged upstream requests for cutting recommender tail latency.
+
+If an upstream call has not answered within a percentile of recently observed latencies, a
+duplicate is sent and whichever answers first wins; the other is cancelled. A token budget caps
+the extra load hedging can add.
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional
+
+import daiquiri
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent upstream latencies.
+
+    :param window: Number of most recent latencies kept
+    :param min_samples: Number of samples needed before percentiles are reported
+    """
+
+    def __init__(self, window: int, min_samples: int):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        """
+        Record the latency of a successful upstream call.
+
+        :param seconds: Latency in seconds
+        :return: None
+        """
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Nearest-rank percentile of the recorded latencies.
+
+        :param percent: Percentile between 0 and 100
+        :return: Latency in seconds, or None if there are not enough samples yet
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedged requests to a fraction of all requests.
+
+    Every request adds ``max_ratio`` tokens (up to ``burst``) and every hedge spends one, so in
+    the long run hedging adds at most ``max_ratio`` extra upstream calls per request.
+
+    :param max_ratio: Maximum extra upstream calls per request (e.g. 0.1 for 10 %)
+    :param burst: Maximum number of tokens that can be saved up
+    """
+
+    def __init__(self, max_ratio: float, burst: float = 10.0):
+        self.max_ratio = max_ratio
+        self.burst = burst
+        self.tokens = 0.0
+
+    def on_request(self) -> None:
+        """
+        Credit the budget for a new request.
+
+        :return: None
+        """
+        self.tokens = min(self.burst, self.tokens + self.max_ratio)
+
+    def try_acquire(self) -> bool:
+        """
+        Spend a token for a hedge if one is available.
+
+        :return: True if the hedge may be sent
+        """
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+async def hedged(
+    call: Callable[[int], Awaitable[Any]], delay: float, budget: HedgeBudget
+) -> Any:
+    """
+    Run a call and, if it has not answered after ``delay`` seconds, a duplicate of it. The first
+    successful answer wins and the other attempt is cancelled. If one attempt fails, the other is
+    still awaited; the error is only raised if both fail.
+
+    :param call: Coroutine function performing one attempt; receives the attempt number (0 for
+        the original, 1 for the hedge) so the hedge can be routed elsewhere
+    :param delay: Seconds to wait before hedging
+    :param budget: Budget capping how many hedges are sent
+    :return: The result of the first successful attempt
+    """
+    budget.on_request()
+    first = asyncio.ensure_future(call(0))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done or not budget.try_acquire():
+        return await first
+    logger.info("Hedging upstream call after %.3f s.", delay)
+    attempts = {first, asyncio.ensure_future(call(1))}
+    error: Optional[BaseException] = None
+    try:
+        while attempts:
+            done, attempts = await asyncio.wait(
+                attempts, return_when=asyncio.FIRST_COMPLETED
+            )
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
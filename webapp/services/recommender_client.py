@@ -0,0 +1,334 @@
+"""
+Pooled asynchronous HTTP client for the upstream attribute recommender.
+
+The client is owned by the application for its whole lifetime: it is opened when the app starts,
+reused (with keep-alive) by every upstream call, and closed on shutdown. Calls are spread across
+the replicas in Config.API_URLS.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import daiquiri
+import httpx
+
+from webapp.config import Config
+from webapp.services.circuit_breaker import CircuitBreaker, is_upstream_failure
+from webapp.services.hedging import HedgeBudget, LatencyTracker, hedged
+from webapp.services.replicas import Replica, ReplicaPool
+from webapp.utils.compression import compress_bytes, supported_encodings
+from webapp.utils.utils import compact_attribute_elements, reformat_attribute_elements
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None  # pylint: disable=invalid-name
+_replicas: Optional[ReplicaPool] = None  # pylint: disable=invalid-name
+_model_version: Optional[str] = None  # pylint: disable=invalid-name
+# Called with the new version whenever the model version changes
+_model_version_listeners: List[Callable[[str], None]] = []
+
+# Shared by all requests so that a degraded upstream is detected across requests
+breaker = CircuitBreaker(
+    Config.CIRCUIT_BREAKER_FAILURE_RATE,
+    min_calls=Config.CIRCUIT_BREAKER_MIN_CALLS,
+    window=Config.CIRCUIT_BREAKER_WINDOW,
+    slow_call=Config.CIRCUIT_BREAKER_SLOW_CALL,
+    reset_timeout=Config.CIRCUIT_BREAKER_RESET_TIMEOUT,
+)
+
+# Recent upstream latencies and the hedging budget, shared by all requests
+latencies = LatencyTracker(
+    Config.RECOMMENDER_HEDGE_WINDOW, Config.RECOMMENDER_HEDGE_MIN_SAMPLES
+)
+hedge_budget = HedgeBudget(Config.RECOMMENDER_HEDGE_MAX_RATIO)
+
+
+def _build_client(**kwargs: Any) -> httpx.AsyncClient:
+    """
+    Build an AsyncClient with a bounded connection pool and the configured timeouts.
+
+    :param kwargs: Extra keyword arguments passed to httpx.AsyncClient (e.g. a test transport)
+    :return: A new httpx.AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=Config.RECOMMENDER_POOL_SIZE,
+        max_keepalive_connections=Config.RECOMMENDER_POOL_SIZE,
+        keepalive_expiry=Config.RECOMMENDER_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        Config.RECOMMENDER_TIMEOUT,
+        connect=Config.RECOMMENDER_CONNECT_TIMEOUT,
+        pool=Config.RECOMMENDER_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, **kwargs)
+
+
+def open_client(**kwargs: Any) -> httpx.AsyncClient:
+    """
+    Create the module-level client if it does not exist yet, checking the request compression
+    setting first.
+
+    :param kwargs: Extra keyword arguments passed to httpx.AsyncClient
+    :return: The module-level httpx.AsyncClient
+    :raises ValueError: If Config.RECOMMENDER_REQUEST_COMPRESSION is not supported here
+    """
+    global _client  # pylint: disable=global-statement
+    if _client is None or _client.is_closed:
+        check_request_compression()
+        _client = _build_client(**kwargs)
+        logger.info(
+            "Opened recommender HTTP client (pool size %d).",
+            Config.RECOMMENDER_POOL_SIZE,
+        )
+    return _client
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the module-level client, opening it lazily when the app lifespan did not.
+
+    :return: The module-level httpx.AsyncClient
+    """
+    return open_client()
+
+
+async def close_client() -> None:
+    """
+    Close the module-level client and release its pooled connections.
+
+    :return: None
+    """
+    global _client  # pylint: disable=global-statement
+    if _client is not None:
+        await _client.aclose()
+        logger.info("Closed recommender HTTP client.")
+    _client = None
+
+
+def model_version() -> str:
+    """
+    Version of the recommender model last reported by the upstream.
+
+    :return: The version identifier, or "" if none has been seen
+    """
+    return _model_version or ""
+
+
+def add_model_version_listener(listener: Callable[[str], None]) -> None:
+    """
+    Register a function called with the new model version whenever it changes.
+
+    :param listener: Function taking the version; it runs on the event loop and must not block
+    :return: None
+    """
+    _model_version_listeners.append(listener)
+
+
+def restore_model_version(version: Optional[str]) -> None:
+    """
+    Start from a model version remembered from before a restart, unless the upstream has
+    already reported one.
+
+    :param version: The remembered version, or None if there is none
+    :return: None
+    """
+    global _model_version  # pylint: disable=global-statement
+    if version and not _model_version:
+        logger.info("Restored recommender model version %s.", version)
+        _model_version = version
+
+
+def _observe_model_version(version: Optional[str]) -> None:
+    global _model_version  # pylint: disable=global-statement
+    if version and version != _model_version:
+        logger.info(
+            "Recommender model version changed from %s to %s.", _model_version, version
+        )
+        _model_version = version
+        for listener in _model_version_listeners:
+            listener(version)
+
+
+async def probe_model_version() -> str:
+    """
+    Ask the upstream for its model version with a cheap GET to Config.RECOMMENDER_VERSION_URL.
+    The version is read from the Config.RECOMMENDER_MODEL_VERSION_HEADER response header or
+    the Config.RECOMMENDER_VERSION_FIELD field of a JSON body.
+
+    :return: The current model version ("" if unknown)
+    """
+    if not Config.RECOMMENDER_VERSION_URL:
+        return model_version()
+    try:
+        response = await get_client().get(Config.RECOMMENDER_VERSION_URL)
+        response.raise_for_status()
+        version = response.headers.get(Config.RECOMMENDER_MODEL_VERSION_HEADER)
+        if version is None:
+            version = response.json().get(Config.RECOMMENDER_VERSION_FIELD)
+    except (httpx.HTTPError, ValueError, AttributeError) as e:
+        logger.warning("Recommender version probe failed: %r", e)
+        return model_version()
+    _observe_model_version(None if version is None else str(version))
+    return model_version()
+
+
+async def probe_model_version_periodically() -> None:
+    """
+    Probe the model version every Config.RECOMMENDER_VERSION_PROBE_INTERVAL seconds until
+    cancelled. The first probe is made after one interval; the app awaits one at startup.
+
+    :return: None
+    """
+    while True:
+        await asyncio.sleep(Config.RECOMMENDER_VERSION_PROBE_INTERVAL)
+        await probe_model_version()
+
+
+def check_request_compression() -> None:
+    """
+    Check that Config.RECOMMENDER_REQUEST_COMPRESSION names a content coding available here.
+
+    :return: None
+    :raises ValueError: If the coding is not supported in this environment
+    """
+    encoding = Config.RECOMMENDER_REQUEST_COMPRESSION
+    if encoding and encoding not in supported_encodings():
+        raise ValueError(
+            f"Unsupported RECOMMENDER_REQUEST_COMPRESSION {encoding!r}; "
+            f"available: {', '.join(supported_encodings())}"
+        )
+
+
+def _encode_body(payload: Any) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize an upstream payload, compressing it when Config.RECOMMENDER_REQUEST_COMPRESSION is
+    set and the body is large enough.
+
+    :param payload: JSON-serializable upstream payload
+    :return: The request body and its headers
+    """
+    content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    encoding = Config.RECOMMENDER_REQUEST_COMPRESSION
+    if encoding and len(content) >= Config.RECOMMENDER_REQUEST_COMPRESSION_MINIMUM_SIZE:
+        content = compress_bytes(
+            content, encoding, Config.RECOMMENDER_REQUEST_COMPRESSION_LEVEL
+        )
+        headers["Content-Encoding"] = encoding
+    return content, headers
+
+
+def get_replicas() -> ReplicaPool:
+    """
+    Return the replica pool, rebuilding it when Config.API_URLS has changed.
+
+    :return: The module-level ReplicaPool
+    """
+    global _replicas  # pylint: disable=global-statement
+    if _replicas is None or _replicas.urls != list(Config.API_URLS):
+        _replicas = ReplicaPool(
+            Config.API_URLS,
+            Config.RECOMMENDER_EWMA_ALPHA,
+            Config.RECOMMENDER_EJECTION_FAILURES,
+            Config.RECOMMENDER_EJECTION_TIME,
+        )
+    return _replicas
+
+
+async def _post(
+    body: Tuple[bytes, Dict[str, str]], avoid: Optional[List[Replica]] = None
+) -> Any:
+    """
+    POST an encoded payload to the best replica and record the outcome in its health state.
+
+    :param body: Request body and headers from _encode_body
+    :param avoid: Replicas already used by this call; the chosen replica is appended to it
+    :return: The decoded JSON response
+    """
+    content, headers = body
+    replicas = get_replicas()
+    replica = replicas.choose(avoid or ())
+    if avoid is not None:
+        avoid.append(replica)
+    replica.in_flight += 1
+    start = time.monotonic()
+    try:
+        response = await get_client().post(
+            replica.url, content=content, headers=headers
+        )
+        response.raise_for_status()
+        result = response.json()
+        _observe_model_version(
+            response.headers.get(Config.RECOMMENDER_MODEL_VERSION_HEADER)
+        )
+    except BaseException as e:
+        if is_upstream_failure(e):
+            replicas.record_failure(replica)
+        raise
+    finally:
+        replica.in_flight -= 1
+    latency = time.monotonic() - start
+    replicas.record_success(replica, latency)
+    latencies.record(latency)
+    return result
+
+
+async def _post_hedged(body: Tuple[bytes, Dict[str, str]]) -> Any:
+    """
+    POST an encoded payload, hedging it when enabled and the call is slower than the configured
+    latency percentile. The hedge goes to a different replica when one is available.
+
+    :param body: Request body and headers from _encode_body
+    :return: The decoded JSON response
+    """
+    if not Config.RECOMMENDER_HEDGING:
+        return await _post(body)
+    delay = latencies.percentile(Config.RECOMMENDER_HEDGE_PERCENTILE)
+    if delay is None:
+        # Not enough samples yet to know what "slow" means
+        return await _post(body)
+    delay = max(delay, Config.RECOMMENDER_HEDGE_MIN_DELAY)
+    used: List[Replica] = []
+    return await hedged(lambda _attempt: _post(body, used), delay, hedge_budget)
+
+
+def encode_payload(attributes: List[Dict[str, Any]]) -> Any:
+    """
+    Encode attribute records in the wire format selected by Config.RECOMMENDER_PAYLOAD_FORMAT:
+    ``records`` sends them as they are (the recommendation service trims them to
+    CACHE_KEY_FIELDS first), ``recommender`` in the recommender's field names (see
+    reformat_attribute_elements), and ``compact`` sends entity-level text once per file (see
+    compact_attribute_elements).
+
+    :param attributes: Attribute records to send upstream
+    :return: JSON-serializable upstream payload
+    :raises ValueError: If the configured format is unknown
+    """
+    payload_format = Config.RECOMMENDER_PAYLOAD_FORMAT
+    if payload_format == "records":
+        return attributes
+    if payload_format == "recommender":
+        return reformat_attribute_elements(attributes)
+    if payload_format == "compact":
+        return compact_attribute_elements(attributes)
+    raise ValueError(f"Unknown recommender payload format: {payload_format}")
+
+
+async def post_recommendations(attributes: List[Dict[str, Any]]) -> Any:
+    """
+    POST attribute records to the attribute recommender, encoded in the configured wire format,
+    through the circuit breaker (hedged when enabled) and return the decoded JSON body.
+
+    :param attributes: Attribute records to send upstream
+    :return: The decoded JSON response
+    :raises CircuitOpenError: If the circuit is open and the call was not attempted
+    :raises httpx.HTTPError: If the request fails or the upstream returns an error status
+    :raises ValueError: If the payload cannot be encoded as configured or the response body is
+        not valid JSON
+    """
+    # Encoded before the call so that local errors do not count against the upstream
+    body = _encode_body(encode_payload(attributes))
+    return await breaker.call(_post_hedged, body)
@@ -0,0 +1,234 @@
+"""
+Registry mapping EML element types to their recommender implementations.
+
+The /api/recommendations gateway dispatches every registered type present in a payload at the
+same time, so adding a recommender does not add serial latency to the endpoint.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+import daiquiri
+
+from webapp.config import Config
+from webapp.services.core import (
+    iter_recommendations_for_attribute,
+    recommend_for_attribute,
+    recommend_for_datatable,
+    recommend_for_geographic_coverage,
+)
+from webapp.utils.utils import ConceptTable
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+RecommendFunction = Callable[..., Awaitable[List[Dict[str, Any]]]]
+StreamFunction = Callable[..., AsyncIterator[List[Dict[str, Any]]]]
+
+
+def skipped_results(
+    elements: List[Dict[str, Any]], done: Optional[Set[Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Results reporting elements that ran out of time like an upstream failure, rather than
+    dropping them.
+
+    :param elements: Elements from the request payload
+    :param done: Ids of elements whose results were already returned, which are left out
+    :return: A result with an empty recommendation list and ``"status": "skipped"`` per element
+    """
+    return [
+        {"id": element.get("id"), "recommendations": [], "status": "skipped"}
+        for element in elements
+        if element.get("id") not in (done or set())
+    ]
+
+
+class RecommenderEntry:
+    """
+    A recommender registered for one EML element type.
+
+    :param eml_type: EML element type key in the request payload (e.g. 'ATTRIBUTE')
+    :param recommend: Coroutine function returning the merged results for a list of elements
+    :param stream: Optional async generator function yielding merged results in parts as they
+        complete; the gateway falls back to ``recommend`` when it is not set
+    :param merge_config: Overrides extending Config.MERGE_CONFIG[eml_type]
+    :param max_concurrency: Maximum concurrent upstream calls per request
+    :param timeout: Seconds after which this type's results are dropped (None for no limit)
+    :param cache: Whether the recommender reads and writes the recommendation cache (on by
+        default, like recommend_for_attribute and the startup warm-up that calls it)
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        eml_type: str,
+        recommend: RecommendFunction,
+        *,
+        stream: Optional[StreamFunction] = None,
+        merge_config: Optional[Dict[str, Any]] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache: bool = True,
+    ):
+        self.eml_type = eml_type
+        self.recommend = recommend
+        self.stream = stream
+        self.merge_config = {
+            **Config.MERGE_CONFIG.get(eml_type, {}),
+            **(merge_config or {}),
+        }
+        self.max_concurrency = max_concurrency or Config.RECOMMENDER_MAX_CONCURRENCY
+        self.timeout = timeout
+        self.cache = cache
+
+    def _options(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "use_cache": self.cache,
+            "merge_config": self.merge_config or None,
+        }
+
+    async def run(
+        self,
+        elements: List[Dict[str, Any]],
+        request_id: str,
+        deadline: Optional[float] = None,
+        table: Optional[ConceptTable] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Recommend for the elements of this type within the entry's timeout.
+
+        :param elements: Elements of this type from the request payload
+        :param request_id: The request UUID to include in each recommendation object
+        :param deadline: Event loop time by which the request wants its results, if any
+        :param table: Concept table to build the normalized response shape into, or None for
+            the default shape
+        :return: Merged recommendation results. If the timeout was exceeded, every element is
+            reported with an empty recommendation list and ``"status": "skipped"``. With a
+            deadline, results without a status are marked complete.
+        """
+        options = self._options()
+        if table is not None:
+            options["table"] = table
+        try:
+            results = await asyncio.wait_for(
+                self.recommend(
+                    elements, request_id=request_id, deadline=deadline, **options
+                ),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.error(
+                "%s recommender exceeded its %s s timeout.", self.eml_type, self.timeout
+            )
+            return skipped_results(elements)
+        if deadline is not None:
+            for item in results:
+                item.setdefault("status", "complete")
+        return results
+
+    async def iter_results(
+        self,
+        elements: List[Dict[str, Any]],
+        request_id: str,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield merged results in parts as they complete, within the entry's timeout.
+
+        :param elements: Elements of this type from the request payload
+        :param request_id: The request UUID to include in each recommendation object
+        :param deadline: Event loop time by which the request wants its results, if any
+        :return: Async iterator over parts of the merged recommendation results. If the timeout
+            is exceeded, the elements not yet yielded are reported with ``"status": "skipped"``.
+        """
+        if self.stream is None:
+            yield await self.run(elements, request_id, deadline)
+            return
+        parts = self.stream(
+            elements, request_id=request_id, deadline=deadline, **self._options()
+        )
+        loop = asyncio.get_running_loop()
+        timeout_at = None if self.timeout is None else loop.time() + self.timeout
+        done: Set[Any] = set()
+        try:
+            while True:
+                remaining = None if timeout_at is None else timeout_at - loop.time()
+                try:
+                    part = await asyncio.wait_for(anext(parts), timeout=remaining)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    logger.error(
+                        "%s recommender exceeded its %s s timeout.",
+                        self.eml_type,
+                        self.timeout,
+                    )
+                    yield skipped_results(elements, done)
+                    return
+                done.update(item.get("id") for item in part)
+                yield part
+        finally:
+            await parts.aclose()
+
+
+_REGISTRY: Dict[str, RecommenderEntry] = {}
+
+
+def register_recommender(entry: RecommenderEntry) -> RecommenderEntry:
+    """
+    Register (or replace) the recommender for an EML element type.
+
+    :param entry: The recommender entry
+    :return: The registered entry
+    """
+    _REGISTRY[entry.eml_type] = entry
+    return entry
+
+
+def get_recommender(eml_type: str) -> Optional[RecommenderEntry]:
+    """
+    Look up the recommender registered for an EML element type.
+
+    :param eml_type: EML element type key
+    :return: The recommender entry, or None if the type is not registered
+    """
+    return _REGISTRY.get(eml_type)
+
+
+def recommenders_for(payload: Dict[str, Any]) -> List[RecommenderEntry]:
+    """
+    Select the registered recommenders for the types present in a payload, in registration order.
+
+    :param payload: The request payload containing EML metadata elements grouped by type
+    :return: List of recommender entries to dispatch
+    """
+    unknown = [eml_type for eml_type in payload if eml_type not in _REGISTRY]
+    if unknown:
+        logger.warning("No recommender registered for EML types: %s", unknown)
+    return [entry for eml_type, entry in _REGISTRY.items() if eml_type in payload]
+
+
+def _settings(eml_type: str) -> Dict[str, Any]:
+    return Config.RECOMMENDER_SETTINGS.get(eml_type, {})
+
+
+register_recommender(
+    RecommenderEntry(
+        "ATTRIBUTE",
+        recommend_for_attribute,
+        stream=iter_recommendations_for_attribute,
+        **_settings("ATTRIBUTE"),
+    )
+)
+register_recommender(
+    RecommenderEntry(
+        "GEOGRAPHICCOVERAGE",
+        recommend_for_geographic_coverage,
+        **_settings("GEOGRAPHICCOVERAGE"),
+    )
+)
+register_recommender(
+    RecommenderEntry("DATATABLE", recommend_for_datatable, **_settings("DATATABLE"))
+)
@@ -0,0 +1,149 @@
+"""
+Client-side load balancing across recommender replicas.
+
+Every replica's health is tracked passively from the outcome of real calls: an exponentially
+weighted moving average (EWMA) of its latency, its number of in-flight calls and its error
+counts. New calls go to the replica with the lowest expected wait, and replicas failing several
+calls in a row are ejected for a while.
+"""
+
+import time
+from typing import Iterable, List, Optional
+
+import daiquiri
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+
+class Replica:
+    """
+    Health state of one recommender replica.
+
+    :param url: Annotate endpoint URL of the replica
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ewma_latency: Optional[float] = None
+        self.in_flight = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        """
+        Whether the replica is currently ejected.
+
+        :param now: Current time.monotonic() value
+        :return: True if calls should avoid the replica
+        """
+        return now < self.ejected_until
+
+    def score(self, prior: float = 1.0) -> float:
+        """
+        Expected wait for a new call: the latency estimate scaled by the calls already in flight.
+
+        :param prior: Latency estimate to use while the replica has not been measured
+        :return: Score, lower is better
+        """
+        latency = prior if self.ewma_latency is None else self.ewma_latency
+        return latency * (self.in_flight + 1)
+
+
+class ReplicaPool:
+    """
+    Set of recommender replicas with least-latency selection and passive ejection.
+
+    :param urls: Annotate endpoint URLs of the replicas
+    :param alpha: Weight of the newest latency sample in the EWMA
+    :param max_failures: Consecutive failures after which a replica is ejected
+    :param ejection_time: Seconds an ejected replica is avoided
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        alpha: float,
+        max_failures: int,
+        ejection_time: float,
+    ):
+        self.replicas = [Replica(url) for url in urls]
+        if not self.replicas:
+            raise ValueError("At least one recommender URL is required.")
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+
+    @property
+    def urls(self) -> List[str]:
+        """
+        URLs of the replicas in configuration order.
+        """
+        return [replica.url for replica in self.replicas]
+
+    def choose(self, avoid: Iterable[Replica] = ()) -> Replica:
+        """
+        Pick the healthy replica with the lowest score. Replicas without a latency estimate are
+        scored with the mean estimate of the others, so their calls in flight still count, and
+        are preferred on a tie so they get measured.
+
+        Replicas in ``avoid`` (e.g. the one a hedged call is already waiting on) are only used
+        when nothing else is available. When every replica is ejected, the one whose ejection
+        ends first is used rather than failing the call.
+
+        :param avoid: Replicas to skip if possible
+        :return: The chosen replica
+        """
+        now = time.monotonic()
+        avoid = list(avoid)
+        healthy = [replica for replica in self.replicas if not replica.is_ejected(now)]
+        candidates = [replica for replica in healthy if replica not in avoid] or healthy
+        if not candidates:
+            return min(self.replicas, key=lambda replica: replica.ejected_until)
+        measured = [
+            replica.ewma_latency
+            for replica in self.replicas
+            if replica.ewma_latency is not None
+        ]
+        prior = sum(measured) / len(measured) if measured else 1.0
+        return min(
+            candidates,
+            key=lambda replica: (
+                replica.score(prior),
+                replica.ewma_latency is not None,
+            ),
+        )
+
+    def record_success(self, replica: Replica, latency: float) -> None:
+        """
+        Record a successful call and update the replica's latency estimate.
+
+        :param replica: The replica that answered
+        :param latency: Latency of the call in seconds
+        :return: None
+        """
+        replica.consecutive_failures = 0
+        if replica.ewma_latency is None:
+            replica.ewma_latency = latency
+        else:
+            replica.ewma_latency += self.alpha * (latency - replica.ewma_latency)
+
+    def record_failure(self, replica: Replica) -> None:
+        """
+        Record a failed call, ejecting the replica after too many failures in a row.
+
+        :param replica: The replica that failed
+        :return: None
+        """
+        replica.errors += 1
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.max_failures:
+            logger.warning(
+                "Ejecting recommender replica %s for %s s after %d failures.",
+                replica.url,
+                self.ejection_time,
+                replica.consecutive_failures,
+            )
+            replica.ejected_until = time.monotonic() + self.ejection_time
+            replica.consecutive_failures = 0
@@ -0,0 +1,102 @@
+"""
+Retries of idempotent upstream recommender calls.
+
+Transient failures (connection errors, timeouts, and 429/502/503/504 answers) are retried with
+capped exponential backoff and full jitter. Every request has its own retry budget, so a
+degraded upstream sees at most a bounded number of extra calls per request rather than a retry
+storm. A retry is never started if its backoff would outlast the request's deadline.
+"""
+
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+import daiquiri
+import httpx
+
+from webapp.config import Config
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether an upstream error is transient and the call is worth repeating.
+
+    :param error: The error raised by the upstream call
+    :return: True for transport errors and the statuses in Config.RECOMMENDER_RETRY_STATUSES
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in Config.RECOMMENDER_RETRY_STATUSES
+    return isinstance(error, httpx.TransportError)
+
+
+def backoff_delay(retry: int, base: float, cap: float) -> float:
+    """
+    Full-jitter exponential backoff.
+
+    :param retry: Number of the retry, starting at 0
+    :param base: Delay ceiling of the first retry in seconds
+    :param cap: Maximum delay ceiling in seconds
+    :return: Seconds to wait, uniformly drawn between 0 and the capped exponential ceiling
+    """
+    return random.uniform(0, min(cap, base * 2**retry))
+
+
+class RetryBudget:  # pylint: disable=too-few-public-methods
+    """
+    Number of retries one request may still spend across all of its upstream calls.
+
+    :param retries: Maximum number of retries for the request
+    """
+
+    def __init__(self, retries: int):
+        self.remaining = retries
+
+    def try_acquire(self) -> bool:
+        """
+        Spend one retry if the budget allows it.
+
+        :return: True if the retry may be made
+        """
+        if self.remaining > 0:
+            self.remaining -= 1
+            return True
+        return False
+
+
+async def call_with_retry(
+    func: Callable[[], Awaitable[Any]],
+    budget: RetryBudget,
+    remaining: Callable[[], Optional[float]] = lambda: None,
+) -> Any:
+    """
+    Run an idempotent async call, retrying transient failures.
+
+    :param func: Coroutine function performing the call
+    :param budget: Retry budget of the request the call belongs to
+    :param remaining: Returns the seconds left before the request's deadline (None for no
+        deadline)
+    :return: The result of the first successful attempt
+    :raises Exception: The last error, once it is not retryable, the attempts or the budget are
+        used up, or the backoff would exceed the deadline
+    """
+    retry = 0
+    while True:
+        try:
+            return await func()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if retry + 1 >= Config.RECOMMENDER_RETRY_ATTEMPTS or not is_retryable(e):
+                raise
+            delay = backoff_delay(
+                retry,
+                Config.RECOMMENDER_RETRY_BASE_DELAY,
+                Config.RECOMMENDER_RETRY_MAX_DELAY,
+            )
+            left = remaining()
+            if (left is not None and delay >= left) or not budget.try_acquire():
+                raise
+            logger.info("Retrying upstream call in %.2f s after %r.", delay, e)
+            await asyncio.sleep(delay)
+            retry += 1
@@ -0,0 +1,73 @@
+"""
+In-flight deduplication ("singleflight") of identical upstream recommender calls.
+
+When the same dataset is open in several tabs or reviewed by several curators at once, identical
+upstream payloads arrive concurrently. Only the first one is sent; the others wait for its
+result, and every caller gets its own copy so that per-request changes do not leak between them.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+import daiquiri
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+
+def payload_key(payload: Any) -> str:
+    """
+    Content hash of an upstream payload.
+
+    :param payload: JSON-serializable upstream payload
+    :return: Hex SHA-256 digest of the payload's canonical JSON
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call among concurrent callers with the same key.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _land(self, key: str, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Mark the error as retrieved even if every caller has given up
+            flight.exception()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func unless a call with the same key is already in flight, in which case wait for
+        that call instead.
+
+        The call runs as its own task, so a caller giving up (e.g. at its deadline) does not
+        cancel it for the others.
+
+        :param key: Key identifying identical calls, e.g. from payload_key
+        :param func: Coroutine function performing the call
+        :return: A private deep copy of the call's result
+        :raises Exception: The call's error, raised to every caller
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(func())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.shared += 1
+            logger.debug("Joining in-flight upstream call %s.", key[:12])
+        result = await asyncio.shield(flight)
+        return copy.deepcopy(result)
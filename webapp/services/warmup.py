@@ -0,0 +1,142 @@
+"""
+Startup warm-up of the recommendation cache and readiness reporting.
+
+At startup, the EML payloads (in the MOCK_FRONTEND_PAYLOAD shape) found in
+Config.WARMUP_PAYLOAD_DIR are run through the normal recommend_for_attribute path in the
+background, so the most-used datasets are cached before the first curator opens them. The app
+reports ready once it is serving and the warm-up has finished; liveness is reported separately
+by the health check.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import daiquiri
+
+from webapp.config import Config
+from webapp.services.core import recommend_for_attribute
+
+daiquiri.setup()
+logger = daiquiri.getLogger(__name__)
+
+
+# pylint: disable=too-few-public-methods
+class WarmupProgress:
+    """
+    Progress of the cache warm-up.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.finished = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Progress as a JSON-serializable dictionary.
+
+        :return: Dictionary with total, completed and failed payload counts and the finished flag
+        """
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "finished": self.finished,
+        }
+
+
+progress = WarmupProgress()
+_serving = False  # pylint: disable=invalid-name
+
+
+def set_serving(serving: bool) -> None:
+    """
+    Record whether the app has finished starting up (or has started shutting down).
+
+    :param serving: True once startup is complete, False when shutdown begins
+    :return: None
+    """
+    global _serving  # pylint: disable=global-statement
+    _serving = serving
+
+
+def is_ready() -> bool:
+    """
+    Whether the app should receive traffic: it is serving and the warm-up has finished.
+
+    :return: True if ready
+    """
+    return _serving and progress.finished
+
+
+def load_payloads(directory: str) -> List[Dict[str, Any]]:
+    """
+    Read the warm-up payloads, skipping files that are not valid JSON objects.
+
+    :param directory: Directory containing one ``*.json`` payload per file
+    :return: List of payloads in file name order
+    """
+    payloads = []
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping warm-up payload %s: %s", path, e)
+            continue
+        if isinstance(payload, dict):
+            payloads.append(payload)
+        else:
+            logger.warning("Skipping warm-up payload %s: not a JSON object", path)
+    return payloads
+
+
+async def warm_up(payloads: List[Dict[str, Any]], concurrency: int) -> None:
+    """
+    Run the attributes of each payload through recommend_for_attribute to fill the cache.
+
+    :param payloads: EML payloads grouped by type
+    :param concurrency: Maximum number of payloads processed at the same time
+    :return: None
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    progress.total = len(payloads)
+    progress.completed = progress.failed = 0
+    progress.finished = False
+
+    async def run(index: int, payload: Dict[str, Any]) -> None:
+        async with semaphore:
+            try:
+                await recommend_for_attribute(
+                    payload.get("ATTRIBUTE", []), request_id=f"warmup-{index}"
+                )
+                progress.completed += 1
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                progress.failed += 1
+                logger.warning("Warm-up payload %d failed: %r", index, e)
+
+    try:
+        await asyncio.gather(
+            *(run(index, payload) for index, payload in enumerate(payloads))
+        )
+    finally:
+        progress.finished = True
+    logger.info("Cache warm-up finished: %s", progress.as_dict())
+
+
+def start_warmup() -> Optional[asyncio.Task]:
+    """
+    Start the warm-up in the background if Config.WARMUP_PAYLOAD_DIR is set.
+
+    :return: The warm-up task, or None if there is nothing to warm up
+    """
+    if not Config.WARMUP_PAYLOAD_DIR:
+        return None
+    payloads = load_payloads(Config.WARMUP_PAYLOAD_DIR)
+    if not payloads:
+        return None
+    logger.info("Warming up the recommendation cache with %d payloads.", len(payloads))
+    progress.finished = False
+    return asyncio.create_task(warm_up(payloads, Config.WARMUP_CONCURRENCY))
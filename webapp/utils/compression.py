@@ -0,0 +1,99 @@
+"""
+gzip and Brotli compression helpers shared by the response middleware and the recommender client.
+
+Brotli is optional: without the ``brotli`` package only gzip is offered.
+"""
+
+import zlib
+from typing import List, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+
+def supported_encodings() -> List[str]:
+    """
+    Content codings available in this environment, most preferred first.
+
+    :return: List of content coding names
+    """
+    return [BROTLI, GZIP] if brotli is not None else [GZIP]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported content coding from an Accept-Encoding header.
+
+    :param accept_encoding: Value of the Accept-Encoding request header
+    :return: The chosen content coding, or None if the client accepts none of them
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding.strip()] = weight
+    best, best_weight = None, 0.0
+    for coding in supported_encodings():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class StreamCompressor:  # pylint: disable=too-few-public-methods
+    """
+    Incremental compressor for one response or request body.
+
+    :param encoding: Content coding, ``gzip`` or ``br``
+    :param level: gzip level (1-9) or Brotli quality (0-11)
+    :raises ValueError: If the coding is not supported here
+    """
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == GZIP:
+            self._gzip = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == BROTLI and brotli is not None:
+            self._brotli = brotli.Compressor(quality=level)
+        else:
+            raise ValueError(f"Unsupported content coding: {encoding}")
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """
+        Compress the next part of the body.
+
+        :param data: Uncompressed bytes
+        :param final: Whether this is the last part; otherwise the output is flushed so the
+            receiver can decode everything sent so far
+        :return: Compressed bytes
+        """
+        if self.encoding == GZIP:
+            flush_mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+            return self._gzip.compress(data) + self._gzip.flush(flush_mode)
+        if final:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._brotli.process(data) + self._brotli.flush()
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    """
+    Compress a whole body.
+
+    :param data: Uncompressed bytes
+    :param encoding: Content coding, ``gzip`` or ``br``
+    :param level: gzip level (1-9) or Brotli quality (0-11)
+    :return: Compressed bytes
+    """
+    return StreamCompressor(encoding, level).compress(data, final=True)
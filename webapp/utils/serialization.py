@@ -0,0 +1,366 @@
+"""
+Encodings of API request and response bodies.
+
+JSON is written with orjson when it is installed, falling back to the standard library, and
+can splice in fragments serialized ahead of time. The binary encodings (MessagePack and CBOR)
+carry exactly the same structure as the JSON bodies. They are optional: without the ``msgpack``
+or ``cbor2`` package the corresponding media type is not offered, and clients get JSON as
+before.
+"""
+
+import json
+import re
+import secrets
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - depends on the environment
+    cbor2 = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+CBOR_MEDIA_TYPE = "application/cbor"
+
+# Media types clients use for MessagePack besides the registered one
+_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+
+class _Placeholders:
+    """
+    Strings standing in for pre-serialized parts while the surrounding value is encoded. Each
+    instance uses a fresh random nonce, so values from clients cannot forge one. Private use code
+    points are written unescaped by both JSON encoders.
+    """
+
+    def __init__(self):
+        nonce = secrets.token_hex(16)
+        self._prefix = f"\ue000{nonce}:"
+        self._pattern = re.compile(
+            b'"' + re.escape(self._prefix.encode("utf-8")) + b'(\\d+)\xee\x80\x80"'
+        )
+        self.used = 0
+
+    def mark(self, index: int) -> str:
+        """
+        Placeholder for a part.
+
+        :param index: Index of the part
+        :return: The placeholder string
+        """
+        self.used += 1
+        return f"{self._prefix}{index}\ue000"
+
+    def split(self, data: bytes) -> Optional[List[bytes]]:
+        """
+        Split encoded output at the placeholders.
+
+        :param data: Output containing the placeholders handed out by mark
+        :return: Alternating literal bytes and part indexes, or None if the output does not
+            contain exactly the placeholders handed out
+        """
+        parts = self._pattern.split(data)
+        if len(parts) != 2 * self.used + 1:
+            return None
+        return parts
+
+
+class JSONFragment(dict):
+    """
+    Dictionary that carries its own JSON serialization, which dumps_json writes as it is instead
+    of encoding the dictionary again. Changing the dictionary drops the serialization.
+
+    :param content: The dictionary's items
+    :param serialized: JSON serialization of exactly these items
+    """
+
+    def __init__(self, content: Dict[str, Any], serialized: bytes):
+        super().__init__(content)
+        self.serialized: Optional[bytes] = serialized
+
+    def _changed(self) -> None:
+        self.serialized = None
+
+    def __setitem__(self, key, value):
+        self._changed()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._changed()
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self._changed()
+        return super().__ior__(other)
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._changed()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._changed()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._changed()
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._changed()
+        super().clear()
+
+
+class JSONSlot:  # pylint: disable=too-few-public-methods
+    """
+    Marks a value of a JSONTemplate that is filled in when the template is rendered.
+
+    :param name: Name of the value
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class JSONTemplate:  # pylint: disable=too-few-public-methods
+    """
+    Dictionary serialized once, with slots (JSONSlot markers, at any depth) for the values that
+    change per use, e.g. the request_id of each recommendation.
+
+    :param content: The dictionary, containing JSONSlot markers
+    """
+
+    def __init__(self, content: Dict[str, Any]):
+        self.content = content
+        self.slots: List[str] = []
+        self._build = _builder(content)
+
+        placeholders = _Placeholders()
+
+        def mark(value: Any) -> str:
+            if not isinstance(value, JSONSlot):
+                raise TypeError(
+                    f"Type is not JSON serializable: {type(value).__name__}"
+                )
+            if value.name not in self.slots:
+                self.slots.append(value.name)
+            return placeholders.mark(self.slots.index(value.name))
+
+        # Alternating fixed bytes and slot indexes
+        parts = placeholders.split(_dumps_plain(content, default=mark))
+        if parts is None:  # pragma: no cover - needs a guessed nonce
+            raise ValueError("Template content contains a placeholder.")
+        self._parts = parts
+
+    def render(self, **values: Any) -> JSONFragment:
+        """
+        Fill in the slots. Only changes to the top level of the result drop its serialization, and
+        nested values without slots are shared between renders, so nested values must not be
+        changed afterwards.
+
+        :param values: Value of every slot, by name
+        :return: The complete dictionary, carrying its serialization
+        """
+        encoded = [_dumps_plain(values[name]) for name in self.slots]
+        parts = self._parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = encoded[int(parts[i])]
+        content = self._build(values) if self._build else self.content
+        return JSONFragment(content, b"".join(parts))
+
+
+def _builder(value: Any) -> Optional[Callable[[Dict[str, Any]], Any]]:
+    """
+    Function rebuilding the parts of a template value that contain slots, sharing the rest.
+
+    :param value: Template value
+    :return: Function from the slot values to the filled-in value, or None if there are no slots
+    """
+    if isinstance(value, JSONSlot):
+        name = value.name
+        return lambda values: values[name]
+    if isinstance(value, dict):
+        builders = {key: _builder(item) for key, item in value.items()}
+        builders = {key: build for key, build in builders.items() if build}
+        if not builders:
+            return None
+        return lambda values: {
+            **value,
+            **{key: build(values) for key, build in builders.items()},
+        }
+    if isinstance(value, list):
+        items = [(item, _builder(item)) for item in value]
+        if not any(build for _, build in items):
+            return None
+        return lambda values: [
+            build(values) if build else item for item, build in items
+        ]
+    return None
+
+
+def _dumps_plain(content: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    if orjson is None:
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=default,
+        ).encode("utf-8")
+    return orjson.dumps(content, default=default)  # pylint: disable=no-member
+
+
+def dumps_json(content: Any) -> bytes:
+    """
+    Serialize a JSON-compatible value to UTF-8 bytes, compactly and without ASCII escaping.
+
+    With orjson, the serialization of unchanged JSONFragment values is reused; the standard
+    library fallback encodes them like any other dictionary.
+
+    :param content: Value made of dicts, lists, strings, numbers, booleans and None
+    :return: JSON bytes
+    :raises TypeError: If the value contains something that is not JSON-compatible
+    """
+    if orjson is None:
+        return _dumps_plain(content)
+    fragments: List[bytes] = []
+    placeholders = _Placeholders()
+
+    def default(value: Any) -> Any:
+        # Subclasses of the builtin types are passed through to here
+        if isinstance(value, JSONFragment) and value.serialized is not None:
+            fragments.append(value.serialized)
+            return placeholders.mark(len(fragments) - 1)
+        for base in (dict, list, str, int, float):
+            if isinstance(value, base):
+                return base(value)
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+    data = orjson.dumps(  # pylint: disable=no-member
+        content,
+        default=default,
+        option=orjson.OPT_PASSTHROUGH_SUBCLASS,  # pylint: disable=no-member
+    )
+    if not fragments:
+        return data
+    parts = placeholders.split(data)
+    if parts is None:  # pragma: no cover - needs a guessed nonce
+        # Encode the fragments like any other dictionary instead
+        return _dumps_plain(content)
+    for i in range(1, len(parts), 2):
+        parts[i] = fragments[int(parts[i])]
+    return b"".join(parts)
+
+
+def supported_media_types() -> List[str]:
+    """
+    Binary media types available in this environment, most preferred first.
+
+    :return: List of media types
+    """
+    media_types = []
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if cbor2 is not None:
+        media_types.append(CBOR_MEDIA_TYPE)
+    return media_types
+
+
+def binary_media_type(content_type: str) -> Optional[str]:
+    """
+    Binary media type named by a Content-Type header, whether or not it is supported here.
+
+    :param content_type: Value of the Content-Type header
+    :return: The canonical binary media type, or None for JSON and anything else
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    media_type = _ALIASES.get(media_type, media_type)
+    if media_type in (MSGPACK_MEDIA_TYPE, CBOR_MEDIA_TYPE):
+        return media_type
+    return None
+
+
+def negotiate_media_type(accept: str) -> Optional[str]:
+    """
+    Pick a binary media type from an Accept header. JSON stays the default: a binary type is only
+    chosen if the client weighs it above JSON.
+
+    :param accept: Value of the Accept request header
+    :return: The chosen binary media type, or None to answer with JSON
+    """
+    weights: Dict[str, float] = {}
+    for part in accept.lower().split(","):
+        media_type, *params = part.split(";")
+        media_type = _ALIASES.get(media_type.strip(), media_type.strip())
+        weight = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if media_type:
+            weights[media_type] = max(weight, weights.get(media_type, 0.0))
+    fallback = max(weights.get("*/*", 0.0), weights.get("application/*", 0.0))
+    best, best_weight = None, weights.get(JSON_MEDIA_TYPE, fallback)
+    for media_type in supported_media_types():
+        weight = weights.get(media_type, 0.0)
+        if weight > best_weight:
+            best, best_weight = media_type, weight
+    return best
+
+
+def encode(content: Any, media_type: str) -> bytes:
+    """
+    Encode a JSON-compatible value.
+
+    :param content: Value made of dicts, lists, strings, numbers, booleans and None
+    :param media_type: A supported binary media type
+    :return: Encoded bytes
+    :raises ValueError: If the media type is not supported here
+    """
+    if media_type == MSGPACK_MEDIA_TYPE and msgpack is not None:
+        return msgpack.packb(content, use_bin_type=True)
+    if media_type == CBOR_MEDIA_TYPE and cbor2 is not None:
+        return cbor2.dumps(content)
+    raise ValueError(f"Unsupported media type: {media_type}")
+
+
+def decode(body: bytes, media_type: str) -> Any:
+    """
+    Decode a body into the same structure as its JSON form.
+
+    :param body: Encoded bytes
+    :param media_type: A supported binary media type
+    :return: Decoded value
+    :raises ValueError: If the media type is not supported here or the body is malformed
+    """
+    if media_type == MSGPACK_MEDIA_TYPE and msgpack is not None:
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            raise ValueError(f"Malformed MessagePack body: {e}") from e
+    if media_type == CBOR_MEDIA_TYPE and cbor2 is not None:
+        try:
+            return cbor2.loads(body)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            raise ValueError(f"Malformed CBOR body: {e}") from e
+    raise ValueError(f"Unsupported media type: {media_type}")
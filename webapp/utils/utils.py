@@ -4,7 +4,7 @@ Utility functions for ontology extraction, recommendation merging, and EML data
 
 import re
 from collections import defaultdict
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar
 
 import daiquiri
 from webapp.config import Config
@@ -12,6 +12,8 @@ from webapp.config import Config
 daiquiri.setup()
 logger = daiquiri.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 def extract_ontology(uri: Optional[str]) -> str:
     """
@@ -35,20 +37,130 @@ def extract_ontology(uri: Optional[str]) -> str:
     return "UNKNOWN"
 
 
+class ConceptTable:
+    """
+    Shared concept and property tables of the normalized response shape. Each distinct concept
+    and property is stored once; recommendations refer to them by index.
+    """
+
+    def __init__(self):
+        self.concepts: List[Dict[str, Any]] = []
+        self.properties: List[Dict[str, Any]] = []
+        self._concept_index: Dict[Tuple[Any, ...], int] = {}
+        self._property_index: Dict[Tuple[Any, ...], int] = {}
+
+    def concept(self, label: Any, uri: Any, ontology: str, description: Any) -> int:
+        """
+        Index of a concept, adding it to the table on first use.
+
+        :param label: Concept label
+        :param uri: Concept URI
+        :param ontology: Ontology code of the concept
+        :param description: Concept definition
+        :return: Index into ``concepts``
+        """
+        key = (uri, label, description)
+        index = self._concept_index.get(key)
+        if index is None:
+            index = self._concept_index[key] = len(self.concepts)
+            self.concepts.append(
+                {
+                    "label": label,
+                    "uri": uri,
+                    "ontology": ontology,
+                    "description": description,
+                }
+            )
+        return index
+
+    def property(self, label: Any, uri: Any) -> int:
+        """
+        Index of an annotation property, adding it to the table on first use.
+
+        :param label: Property label
+        :param uri: Property URI
+        :return: Index into ``properties``
+        """
+        key = (uri, label)
+        index = self._property_index.get(key)
+        if index is None:
+            index = self._property_index[key] = len(self.properties)
+            self.properties.append({"propertyLabel": label, "propertyUri": uri})
+        return index
+
+    def normalize_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convert merged results in the default shape (e.g. from recommenders that do not build
+        the tables themselves) to the normalized shape.
+
+        :param results: Merged results with full recommendation objects
+        :return: Results whose recommendations refer to the tables by index
+        """
+        normalized = []
+        for item in results:
+            entry = {k: v for k, v in item.items() if k != "recommendations"}
+            entry["recommendations"] = []
+            for rec in item.get("recommendations", []):
+                for field in ("attributeName", "objectName"):
+                    if field in rec:
+                        entry.setdefault(field, rec[field])
+                entry["recommendations"].append(
+                    {
+                        "concept": self.concept(
+                            rec.get("label"),
+                            rec.get("uri"),
+                            rec.get("ontology"),
+                            rec.get("description"),
+                        ),
+                        "property": self.property(
+                            rec.get("propertyLabel"), rec.get("propertyUri")
+                        ),
+                        "confidence": rec.get("confidence"),
+                    }
+                )
+            normalized.append(entry)
+        return normalized
+
+    def response(
+        self, results: List[Dict[str, Any]], request_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Assemble the normalized response.
+
+        :param results: Normalized merged results
+        :param request_id: The request UUID
+        :return: Dictionary with ``request_id``, ``concepts``, ``properties`` and ``results``
+        """
+        return {
+            "request_id": request_id,
+            "concepts": self.concepts,
+            "properties": self.properties,
+            "results": results,
+        }
+
+
 def merge_recommender_results(
     source_items: List[Dict[str, Any]],
     recommender_items: List[Dict[str, Any]],
     eml_type: str = "ATTRIBUTE",
+    config: Optional[Dict[str, Any]] = None,
+    table: Optional[ConceptTable] = None,
 ) -> List[Dict[str, Any]]:
     """
     Joins recommender response back to source items using 'column_name'.
 
+    With a concept table, the merged results are built in the normalized shape: concepts and
+    properties go into the shared table once, and each result carries its attributeName and
+    objectName and a list of ``{"concept", "property", "confidence"}`` index records.
+
     :param source_items: List of source item dictionaries
     :param recommender_items: List of recommender result dictionaries
     :param eml_type: EML type (e.g., 'ATTRIBUTE')
+    :param config: Merge configuration (defaults to Config.MERGE_CONFIG[eml_type])
+    :param table: Concept table to build the normalized shape into, or None for the default shape
     :return: List of merged result dictionaries, each with an 'id' and 'recommendations'
     """
-    config = Config.MERGE_CONFIG.get(eml_type)
+    config = config or Config.MERGE_CONFIG.get(eml_type)
     if not config:
         logger.error("No merge config found for eml_type: %s", eml_type)
         return []
@@ -64,8 +176,27 @@ def merge_recommender_results(
         match_val = item.get("name")
         if match_val in rec_lookup:
             entry = {"id": item["id"], "recommendations": []}
+            if table is not None:
+                entry["attributeName"] = item.get("name")
+                entry["objectName"] = item.get("objectName")
             for rec_data in rec_lookup[match_val]:
                 try:
+                    if table is not None:
+                        entry["recommendations"].append(
+                            {
+                                "concept": table.concept(
+                                    rec_data["concept_name"],
+                                    rec_data["concept_id"],
+                                    extract_ontology(rec_data["concept_id"]),
+                                    rec_data["concept_definition"],
+                                ),
+                                "property": table.property(
+                                    config["property_label"], config["property_uri"]
+                                ),
+                                "confidence": rec_data["confidence"],
+                            }
+                        )
+                        continue
                     annot = {
                         "label": rec_data["concept_name"],
                         "uri": rec_data["concept_id"],
@@ -116,6 +247,54 @@ def reformat_attribute_elements(
     return reformatted
 
 
+def compact_attribute_elements(
+    attributes: List[Dict[str, Any]],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Transform attribute elements to a compact recommender payload in which the entity-level
+    fields of each file are sent once and every column refers to its entity by index. Identical
+    column records are only sent once.
+
+    :param attributes: List of attribute dictionaries
+    :return: Dictionary with an ``entities`` list and a ``columns`` list
+    """
+    entities: List[Dict[str, Any]] = []
+    entity_index: Dict[Tuple[Any, ...], int] = {}
+    columns: List[Dict[str, Any]] = []
+    seen: Set[Tuple[Any, ...]] = set()
+    for element in reformat_attribute_elements(attributes):
+        entity_key = (
+            element["entity_name"],
+            element["entity_description"],
+            element["object_name"],
+        )
+        if entity_key not in entity_index:
+            entity_index[entity_key] = len(entities)
+            entities.append(
+                {
+                    "entity_name": element["entity_name"],
+                    "entity_description": element["entity_description"],
+                    "object_name": element["object_name"],
+                }
+            )
+        column_key = (
+            entity_index[entity_key],
+            element["column_name"],
+            element["column_description"],
+        )
+        if column_key in seen:
+            continue
+        seen.add(column_key)
+        columns.append(
+            {
+                "entity": column_key[0],
+                "column_name": element["column_name"],
+                "column_description": element["column_description"],
+            }
+        )
+    return {"entities": entities, "columns": columns}
+
+
 def reformat_geographic_coverage_elements(
     geos: List[Dict[str, Any]],
 ) -> List[Dict[str, Any]]:
@@ -128,3 +307,34 @@ def reformat_geographic_coverage_elements(
     """
     logger.info("Reformatting %d geographic coverage elements (stub).", len(geos))
     return geos
+
+
+def chunk_items(
+    items: List[T],
+    max_items: int,
+    max_bytes: int,
+    size_of: Callable[[T], int],
+) -> List[List[T]]:
+    """
+    Split items into consecutive chunks bounded by item count and approximate byte size. An item
+    larger than max_bytes on its own gets a chunk to itself.
+
+    :param items: Items to split, in order
+    :param max_items: Maximum number of items per chunk
+    :param max_bytes: Maximum approximate size in bytes per chunk
+    :param size_of: Function returning the approximate size in bytes of an item
+    :return: List of chunks preserving the order of the items
+    """
+    chunks: List[List[T]] = []
+    current: List[T] = []
+    current_bytes = 0
+    for item in items:
+        size = size_of(item)
+        if current and (len(current) >= max_items or current_bytes + size > max_bytes):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(item)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks